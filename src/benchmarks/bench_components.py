@@ -0,0 +1,210 @@
+"""
+Component Micro-Benchmarks: Times the HYBRIDJOIN components in isolation on synthetic data
+(see generate_data.py) and writes the results as JSON, so runs from different commits can
+be compared.
+
+    stream_buffer    push_many + pop_many of every stream tuple
+    hash_table       insert every tuple, then pop keys in queue order
+    queue            enqueue + dequeue one node per tuple
+    disk_buffer      DiskBuffer.load_partition for the key of every tuple (page store, cached)
+    join_loop        the full join thread on a prefilled stream buffer, into a MemorySink
+    join_loop_hot    join_loop with the hot-key cache (1000 resident customers)
+    join_loop_inline join_loop with product enrichment in the join thread (no product stage)
+    join_vectorized  the vectorized micro-batch engine in place of hybridjoin_worker
+
+Usage:
+    python src/benchmarks/bench_components.py --rows 100000 1000000 --out results.json
+    python src/benchmarks/bench_components.py --rows 100000 --compare results.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+import pandas as pd
+
+# Add the HYBRIDJOIN modules to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hybrid_join'))
+
+from stream_buffer import StreamBuffer
+from hash_table import HashTable
+from key_queue import Queue
+from disk_buffer import DiskBuffer
+from partition_cache import PartitionCache
+from page_store import ensure_page_store, EXTENSION
+from main import HybridJoinETL, TRANSACTION_DTYPES, ENGINES, generate_tuples
+from generate_data import generate
+from memory_sink import MemorySink
+
+BENCHMARKS = {}
+
+def benchmark(name: str):
+    """Register a benchmark; it takes the data set and returns the number of rows processed"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+class DataSet:
+    def __init__(self, paths: dict):
+        self.paths = paths
+        self.customer_pages = os.path.splitext(paths["customers"])[0] + EXTENSION
+        self.product_pages = os.path.splitext(paths["products"])[0] + EXTENSION
+        ensure_page_store(paths["customers"], self.customer_pages, "Customer_ID")
+        ensure_page_store(paths["products"], self.product_pages, "Product_ID")
+        df = pd.read_csv(paths["transactions"], usecols=list(TRANSACTION_DTYPES), dtype=TRANSACTION_DTYPES)
+        self.tuples = generate_tuples(df)
+
+@benchmark("stream_buffer")
+def bench_stream_buffer(data: DataSet, batch_size: int = 100) -> int:
+    tuples = data.tuples
+    stream_buffer = StreamBuffer()
+    for start in range(0, len(tuples), batch_size):
+        stream_buffer.push_many(tuples[start:start + batch_size])
+    while stream_buffer.pop_many(batch_size):
+        pass
+    return len(tuples)
+
+@benchmark("hash_table")
+def bench_hash_table(data: DataSet) -> int:
+    tuples = data.tuples
+    queue = Queue()
+    hash_table = HashTable(hS=len(tuples), queue=queue)
+    for row in tuples:
+        hash_table.insert(row[1], row)
+    while True:
+        key = queue.peek()
+        if key is None:
+            break
+        hash_table.pop(key)
+    return len(tuples)
+
+@benchmark("queue")
+def bench_queue(data: DataSet) -> int:
+    queue = Queue()
+    for row in data.tuples:
+        queue.enqueue(row[1])
+    while queue.dequeue() is not None:
+        pass
+    return len(data.tuples)
+
+@benchmark("disk_buffer")
+def bench_disk_buffer(data: DataSet, cache_partitions: int = 32) -> int:
+    disk_buffer = DiskBuffer(data.customer_pages, key_column="Customer_ID",
+                             cache=PartitionCache(cache_partitions))
+    for row in data.tuples:
+        disk_buffer.load_partition(row[1])
+    disk_buffer.close()
+    return len(data.tuples)
+
+@benchmark("join_loop")
+def bench_join_loop(data: DataSet, hot_keys: int = 0, product_stage: bool = True,
+                    engine: str = "hybridjoin") -> int:
+    paths = data.paths
+    etl = HybridJoinETL("", "", paths["transactions"], paths["customers"], paths["products"],
+                        customer_master_pages=data.customer_pages, product_master_pages=data.product_pages,
+                        sink=MemorySink(), hot_keys=hot_keys, product_stage=product_stage)
+    etl.stream_buffer.push_many(data.tuples)
+    stop_event = threading.Event()
+    # The join thread reports progress on stdout; keep it out of the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        join_thread = threading.Thread(target=ENGINES[engine], args=(etl, stop_event))
+        join_thread.start()
+        while etl.loader is None or etl.stream_buffer.size() or etl.queue.peek() is not None:
+            time.sleep(0.01)
+        stop_event.set()
+        join_thread.join()
+    return etl.processed_count
+
+@benchmark("join_loop_hot")
+def bench_join_loop_hot(data: DataSet) -> int:
+    return bench_join_loop(data, hot_keys=1000)
+
+@benchmark("join_loop_inline")
+def bench_join_loop_inline(data: DataSet) -> int:
+    return bench_join_loop(data, product_stage=False)
+
+@benchmark("join_vectorized")
+def bench_join_vectorized(data: DataSet) -> int:
+    return bench_join_loop(data, product_stage=False, engine="vectorized")
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(rows_list: list, names: list, repeat: int = 3, data_dir: str = None, **generator_args) -> dict:
+    """Run the selected benchmarks at every size; the best of repeat runs is reported"""
+    results = []
+    for n_rows in rows_list:
+        settings = "_".join(str(value) for value in generator_args.values())
+        out_dir = os.path.join(data_dir or tempfile.gettempdir(), f"hybridjoin_bench_{n_rows}_{settings}")
+        data = DataSet(generate(out_dir, n_rows, overwrite=False, **generator_args))
+        for name in names:
+            times = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                processed = BENCHMARKS[name](data)
+                times.append(time.perf_counter() - started)
+            best = min(times)
+            results.append({
+                "name": name,
+                "rows": n_rows,
+                "processed": processed,
+                "seconds": round(best, 6),
+                "rows_per_sec": round(processed / best, 1) if best else None,
+            })
+            print(f"{name:<16} {n_rows:>10} rows  {best:9.4f} s  {processed / best:14,.0f} rows/s")
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "generator": generator_args,
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the throughput of every benchmark relative to a baseline report"""
+    previous = {(r["name"], r["rows"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('revision')}:")
+    for result in report["results"]:
+        old = previous.get((result["name"], result["rows"]))
+        if old is None or not old["rows_per_sec"]:
+            continue
+        ratio = result["rows_per_sec"] / old["rows_per_sec"]
+        print(f"{result['name']:<16} {result['rows']:>10} rows  x{ratio:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HYBRIDJOIN component micro-benchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000], help="stream sizes to run")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--fanout", type=int, default=20)
+    parser.add_argument("--customers", type=int, default=6000)
+    parser.add_argument("--products", type=int, default=3600)
+    parser.add_argument("--data-dir", help="where generated data is kept (default: temp dir)")
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    report = run(args.rows, args.only, repeat=args.repeat, data_dir=args.data_dir,
+                 n_customers=args.customers, n_products=args.products, skew=args.skew, fanout=args.fanout)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(report, json.load(file))
@@ -0,0 +1,130 @@
+"""
+Synthetic Data Generator: Writes transactional, customer master and product master CSVs
+with the same schemas as the files in data/, so the ETL and the benchmarks can run
+without the real datasets.
+
+Stream keys are skewed: Customer_ID is drawn from a Zipf distribution with exponent
+skew (0 = uniform), and each customer buys from a small set of fanout products around
+a customer-specific offset, so products are shared between customers but not uniformly.
+Dates increase with orderID, so the stream can be replayed in time order.
+
+Usage:
+    python src/benchmarks/generate_data.py out_dir --rows 1000000 --customers 6000 \
+        --products 3600 --skew 1.1 --fanout 20
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+GENDERS = np.array(["M", "F"])
+AGES = np.array(["0-17", "18-25", "26-35", "36-45", "46-50", "51-55", "55+"])
+CITY_CATEGORIES = np.array(["A", "B", "C"])
+STAY_YEARS = np.array(["0", "1", "2", "3", "4+"])
+CATEGORIES = np.array(["Home & Kitchen", "Grocery", "Pets", "Electronics", "Clothing", "Sports", "Books"])
+STORES = np.array(["Tech Haven", "Sound Zone", "Fashion Hub", "Home Essentials", "Pet Paradise",
+                   "Fresh Mart", "Book World", "Sport Central", "Mega Mart", "Value Store"])
+
+FIRST_CUSTOMER_ID = 1000001
+FIRST_DATE = np.datetime64("2015-01-01")
+N_DAYS = 6 * 365
+
+def customer_ids(n_customers: int) -> np.ndarray:
+    return np.arange(FIRST_CUSTOMER_ID, FIRST_CUSTOMER_ID + n_customers)
+
+def product_ids(n_products: int) -> np.ndarray:
+    return np.char.add("P", np.char.zfill(np.arange(n_products).astype(str), 8))
+
+def zipf_sample(rng: np.random.Generator, n_values: int, size: int, skew: float) -> np.ndarray:
+    """Indexes in [0, n_values) with P(i) proportional to 1 / (i + 1) ** skew"""
+    if skew <= 0:
+        return rng.integers(0, n_values, size)
+    weights = 1.0 / np.arange(1, n_values + 1) ** skew
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    ranks = np.searchsorted(cdf, rng.random(size), side="right")
+    # Scatter popularity over the key range so hot keys are not all in the first partition
+    return rng.permutation(n_values)[np.minimum(ranks, n_values - 1)]
+
+def generate_customers(rng: np.random.Generator, n_customers: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Customer_ID": customer_ids(n_customers),
+        "Gender": rng.choice(GENDERS, n_customers),
+        "Age": rng.choice(AGES, n_customers),
+        "Occupation": rng.integers(0, 21, n_customers),
+        "City_Category": rng.choice(CITY_CATEGORIES, n_customers),
+        "Stay_In_Current_City_Years": rng.choice(STAY_YEARS, n_customers),
+        "Marital_Status": rng.integers(0, 2, n_customers),
+    })
+
+def generate_products(rng: np.random.Generator, n_products: int, n_stores: int = 10,
+                      n_suppliers: int = 50) -> pd.DataFrame:
+    store_ids = rng.integers(1, n_stores + 1, n_products)
+    supplier_ids = rng.integers(1, n_suppliers + 1, n_products)
+    return pd.DataFrame({
+        "Product_ID": product_ids(n_products),
+        "Product_Category": rng.choice(CATEGORIES, n_products),
+        "price$": np.round(rng.uniform(1, 500, n_products), 2),
+        "storeID": store_ids,
+        "supplierID": supplier_ids,
+        "storeName": STORES[(store_ids - 1) % len(STORES)],
+        "supplierName": np.char.add("Sup ", supplier_ids.astype(str)),
+    })
+
+def generate_transactions(rng: np.random.Generator, n_rows: int, n_customers: int, n_products: int,
+                          skew: float, fanout: int, first_order_id: int = 1, total_rows: int = None) -> pd.DataFrame:
+    customers = zipf_sample(rng, n_customers, n_rows, skew)
+    # Each customer draws from fanout products starting at its own offset
+    offsets = (customers.astype(np.int64) * 7919) % n_products
+    products = (offsets + rng.integers(0, max(1, fanout), n_rows)) % n_products
+    # Dates advance with orderID over N_DAYS, as in an ordered transaction log (for replay)
+    positions = first_order_id - 1 + np.arange(n_rows) + rng.random(n_rows)
+    days = (positions * N_DAYS / (total_rows or n_rows)).astype(np.int64)
+    dates = FIRST_DATE + days.astype("timedelta64[D]")
+    return pd.DataFrame({
+        "orderID": np.arange(first_order_id, first_order_id + n_rows),
+        "Customer_ID": customer_ids(n_customers)[customers],
+        "Product_ID": product_ids(n_products)[products],
+        "quantity": rng.integers(1, 6, n_rows),
+        "date": np.datetime_as_string(dates, unit="D"),
+    })
+
+def generate(out_dir: str, n_rows: int = 100000, n_customers: int = 6000, n_products: int = 3600,
+             skew: float = 1.1, fanout: int = 20, seed: int = 0, chunk_rows: int = 1000000,
+             overwrite: bool = True) -> dict:
+    """Write the three CSVs to out_dir and return their paths (kept if present, unless overwrite)"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = {
+        "transactions": os.path.join(out_dir, "transactional_data.csv"),
+        "customers": os.path.join(out_dir, "customer_master_data.csv"),
+        "products": os.path.join(out_dir, "product_master_data.csv"),
+    }
+    if not overwrite and all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    generate_customers(rng, n_customers).to_csv(paths["customers"], index=False)
+    generate_products(rng, n_products).to_csv(paths["products"], index=False)
+
+    # Transactions are written in chunks so 10^7 rows do not have to fit in memory
+    for start in range(0, n_rows, chunk_rows):
+        chunk = generate_transactions(rng, min(chunk_rows, n_rows - start), n_customers, n_products,
+                                      skew, fanout, first_order_id=start + 1, total_rows=n_rows)
+        chunk.to_csv(paths["transactions"], index=False, mode="w" if start == 0 else "a", header=start == 0)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic HYBRIDJOIN input data")
+    parser.add_argument("out_dir")
+    parser.add_argument("--rows", type=int, default=100000, help="transactional rows")
+    parser.add_argument("--customers", type=int, default=6000)
+    parser.add_argument("--products", type=int, default=3600)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of Customer_ID (0 = uniform)")
+    parser.add_argument("--fanout", type=int, default=20, help="distinct products per customer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate(args.out_dir, args.rows, args.customers, args.products, args.skew, args.fanout, args.seed)
+    for name, path in paths.items():
+        print(f"Wrote {name}: {path}")
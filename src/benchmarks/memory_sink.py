@@ -0,0 +1,69 @@
+"""
+Memory Sink: A stand-in for FactLoader that keeps FactSales rows in memory instead of
+writing them to MySQL. It batches and acknowledges rows the same way (add/add_many/poll/
+flush/close and on_commit(committed, failed)), so the join can be measured without a database.
+"""
+
+import time
+
+class MemorySink:
+    def __init__(self, batch_size: int = 500, max_latency: float = 0.5, keep_rows: bool = False,
+                 on_commit=None):
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.keep_rows = keep_rows
+        self.on_commit = on_commit
+
+        self.rows = []
+        self.tokens = []
+        self.first_added = None
+        self.loaded = []  # committed rows, if keep_rows
+
+        # Statistics
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+
+    def add(self, row: tuple, token=None) -> None:
+        if not self.rows:
+            self.first_added = time.monotonic()
+        self.rows.append(row)
+        self.tokens.append(token)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows: list, tokens: list) -> None:
+        if not rows:
+            return
+        if not self.rows:
+            self.first_added = time.monotonic()
+        self.rows.extend(rows)
+        self.tokens.extend(tokens)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def poll(self) -> None:
+        if self.rows and time.monotonic() - self.first_added >= self.max_latency:
+            self.flush()
+
+    def pending(self) -> int:
+        return len(self.rows)
+
+    def set_batching(self, batch_size: int, max_latency: float) -> None:
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        rows, tokens = self.rows, self.tokens
+        self.rows, self.tokens, self.first_added = [], [], None
+        if self.keep_rows:
+            self.loaded.extend(rows)
+        self.batches += 1
+        self.committed += len(rows)
+        if self.on_commit:
+            self.on_commit(tokens, [])
+
+    def close(self) -> None:
+        self.flush()
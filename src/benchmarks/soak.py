@@ -0,0 +1,202 @@
+"""
+Soak Test: Runs the whole pipeline (feeder, HYBRIDJOIN, loader) under an arrival profile
+and target rate, against the in-memory sink or MySQL, and reports
+    - ingest and load throughput, time the feeder was throttled by backpressure
+    - stream-buffer and hash-table backlog over time
+    - join lag percentiles (time from push into the stream buffer to commit)
+A run is sustainable if the feeder kept up with the mean target rate (>= 95%), the join kept
+up with the feeder (>= 90%) and the backlog at the end is below max_backlog seconds of
+arrivals. --find-max doubles the rate until a run is not sustainable, then bisects to the
+maximum sustainable throughput.
+
+Usage:
+    python src/benchmarks/soak.py --profile poisson --rate 5000 --duration 30
+    python src/benchmarks/soak.py --profile bursts --find-max --out soak.json
+    python src/benchmarks/soak.py --mysql --data-dir data ...   (DW must hold the same master data)
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import numpy as np
+
+# Add the HYBRIDJOIN modules to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hybrid_join'))
+
+from main import HybridJoinETL, stream_feeder, hybridjoin_worker
+from arrivals import PROFILES, make_profile
+from page_store import ensure_page_store, EXTENSION
+from generate_data import generate
+from memory_sink import MemorySink
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4), "max": round(max(values), 4)}
+
+def soak_run(paths: dict, profile: str, rate: float, duration: float = 10.0, buffer_capacity: int = 100000,
+             max_backlog: float = 1.0, sample_interval: float = 0.25, db: tuple = None) -> dict:
+    """Run the pipeline for duration seconds at one target rate"""
+    customer_pages = os.path.splitext(paths["customers"])[0] + EXTENSION
+    product_pages = os.path.splitext(paths["products"])[0] + EXTENSION
+    ensure_page_store(paths["customers"], customer_pages, "Customer_ID")
+    ensure_page_store(paths["products"], product_pages, "Product_ID")
+
+    db_user, db_password = db or ("", "")
+    etl = HybridJoinETL(db_user, db_password, paths["transactions"], paths["customers"], paths["products"],
+                        customer_master_pages=customer_pages, product_master_pages=product_pages,
+                        buffer_capacity=buffer_capacity, sink=None if db else MemorySink())
+
+    # Join lag: push time of every pending Order_ID, resolved when its row commits
+    pushed_at = {}
+    lags = []
+    def on_push(batch: list) -> None:
+        now = time.monotonic()
+        for row in batch:
+            pushed_at[row[0]] = now
+
+    commit = etl.on_commit
+    def on_commit(committed: list, failed: list, loaded: int = None) -> None:
+        now = time.monotonic()
+        lags.extend(now - pushed_at.pop(row[0], now) for row in committed)
+        for row in failed:
+            pushed_at.pop(row[0], None)
+        commit(committed, failed, loaded)
+    etl.on_commit = on_commit
+
+    arrivals = make_profile(profile, rate)
+    feed_stop = threading.Event()
+    join_stop = threading.Event()
+    feeder_thread = threading.Thread(
+        target=stream_feeder,
+        args=(etl.stream_buffer, paths["transactions"], feed_stop),
+        kwargs=dict(arrivals=arrivals, on_push=on_push)
+    )
+    join_thread = threading.Thread(target=hybridjoin_worker, args=(etl, join_stop))
+
+    samples = []  # (seconds, stream buffer depth, hash table entries)
+    with contextlib.redirect_stdout(io.StringIO()):
+        join_thread.start()
+        while etl.loader is None and join_thread.is_alive():
+            time.sleep(0.01)
+        started = time.monotonic()
+        feeder_thread.start()
+        while (elapsed := time.monotonic() - started) < duration:
+            samples.append((round(elapsed, 3), etl.stream_buffer.size(), etl.hash_table.get_total_entries()))
+            time.sleep(sample_interval)
+        exhausted = not feeder_thread.is_alive()
+        feed_stop.set()
+        feeder_thread.join()
+        elapsed = time.monotonic() - started
+        backlog = etl.stream_buffer.size() + etl.hash_table.get_total_entries()
+        pushed = etl.stream_buffer.pushed
+        loaded = etl.loaded_count
+        join_stop.set()
+        join_thread.join()
+    buffer_stats = etl.stream_buffer.stats()
+    etl.stream_buffer.close()
+
+    ingest_rate = pushed / elapsed
+    offered_rate = arrivals.mean_rate or ingest_rate
+    load_rate = loaded / elapsed
+    sustainable = (ingest_rate >= 0.95 * offered_rate and load_rate >= 0.9 * ingest_rate
+                   and backlog <= max_backlog * offered_rate)
+    return {
+        "profile": profile,
+        "rate": rate,
+        "offered_rate": round(offered_rate, 1),
+        "duration": round(elapsed, 3),
+        "pushed": pushed,
+        "loaded": loaded,
+        "ingest_rate": round(ingest_rate, 1),
+        "load_rate": round(load_rate, 1),
+        "throttled_seconds": buffer_stats["throttled_seconds"],
+        "final_backlog": backlog,
+        "data_exhausted": exhausted,
+        "sustainable": sustainable,
+        "join_lag": percentiles(lags),
+        "backlog": samples,
+    }
+
+def report(run: dict) -> None:
+    lag = run["join_lag"]
+    print(f"{run['profile']:<9} offered {run['offered_rate']:>9,.0f}/s  ingest {run['ingest_rate']:>9,.0f}/s  "
+          f"load {run['load_rate']:>9,.0f}/s  backlog {run['final_backlog']:>7}  "
+          f"lag p50 {lag['p50']} p99 {lag['p99']} max {lag['max']}  "
+          f"{'ok' if run['sustainable'] else 'NOT SUSTAINABLE'}{' (data exhausted)' if run['data_exhausted'] else ''}")
+
+def find_max_rate(paths: dict, profile: str, start_rate: float, steps: int = 4, **run_args) -> tuple:
+    """Double the rate until a run is not sustainable, then bisect; returns (max rate, runs)"""
+    runs = []
+    best, rate = None, start_rate
+    while True:
+        run = soak_run(paths, profile, rate, **run_args)
+        runs.append(run)
+        report(run)
+        if not run["sustainable"] or run["data_exhausted"]:
+            break
+        best, rate = rate, rate * 2
+
+    low, high = best or 0.0, rate
+    for _ in range(steps):
+        mid = (low + high) / 2
+        run = soak_run(paths, profile, mid, **run_args)
+        runs.append(run)
+        report(run)
+        if run["sustainable"] and not run["data_exhausted"]:
+            low = best = mid
+        else:
+            high = mid
+    return best, runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HYBRIDJOIN soak test")
+    parser.add_argument("--profile", choices=list(PROFILES), default="constant")
+    parser.add_argument("--rate", type=float, default=5000,
+                        help="target rate in tuples per second (replay: speedup of one day)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--find-max", action="store_true", help="search for the maximum sustainable rate")
+    parser.add_argument("--max-backlog", type=float, default=1.0,
+                        help="sustainable if the final backlog is below this many seconds of arrivals")
+    parser.add_argument("--buffer-capacity", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=1000000, help="rows of synthetic data to generate")
+    parser.add_argument("--data-dir", help="use the CSVs in this directory instead of generating data")
+    parser.add_argument("--mysql", action="store_true", help="load into MySQL instead of the in-memory sink")
+    parser.add_argument("--out", help="write the runs as JSON")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        paths = {
+            "transactions": os.path.join(args.data_dir, "transactional_data.csv"),
+            "customers": os.path.join(args.data_dir, "customer_master_data.csv"),
+            "products": os.path.join(args.data_dir, "product_master_data.csv"),
+        }
+    else:
+        out_dir = os.path.join(tempfile.gettempdir(), f"hybridjoin_soak_{args.rows}")
+        paths = generate(out_dir, args.rows, overwrite=False)
+
+    db = None
+    if args.mysql:
+        db = (input("MySQL User (e.g., root): "), input("MySQL Password: "))
+
+    run_args = dict(duration=args.duration, buffer_capacity=args.buffer_capacity,
+                    max_backlog=args.max_backlog, db=db)
+    if args.find_max:
+        best, runs = find_max_rate(paths, args.profile, args.rate, **run_args)
+        print(f"\nMaximum sustainable rate ({args.profile}): {best:,.0f} tuples/s" if best
+              else f"\nNo sustainable rate found at or below {args.rate:,.0f} tuples/s")
+    else:
+        runs = [soak_run(paths, args.profile, args.rate, **run_args)]
+        report(runs[0])
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump({"profile": args.profile, "runs": runs}, file, indent=2)
+        print(f"Results written to {args.out}")
@@ -4,6 +4,9 @@ CREATE DATABASE walmart_dw;
 USE walmart_dw;
 
 -- Drop existing tables if they exist (in correct order due to FK constraints)
+DROP TABLE IF EXISTS AggStoreQuarter;
+DROP TABLE IF EXISTS AggProductMonth;
+DROP TABLE IF EXISTS AggSegmentMonth;
 DROP TABLE IF EXISTS FactSales;
 DROP TABLE IF EXISTS DimCustomer;
 DROP TABLE IF EXISTS DimProduct;
@@ -104,7 +107,51 @@ CREATE TABLE FactSales (
     INDEX idx_product (Product_ID),
     INDEX idx_date (Date_ID),
     INDEX idx_store (Store_ID),
-    INDEX idx_order (Order_ID)
+    -- One row per order: makes replayed loads (resume from checkpoint) idempotent
+    UNIQUE INDEX idx_order (Order_ID)
+);
+
+-- ============================================================
+-- AGGREGATE TABLES
+-- ============================================================
+-- Maintained by the ETL in the same transaction as each FactSales batch
+-- (see src/hybrid_join/aggregates.py). Revenue and Quantity are running sums,
+-- Sales_Count the number of FactSales rows.
+
+-- AggStoreQuarter: Revenue by store and quarter
+CREATE TABLE AggStoreQuarter (
+    Store_ID INT NOT NULL,
+    Year INT NOT NULL,
+    Quarter INT NOT NULL,
+    Revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    Quantity BIGINT NOT NULL DEFAULT 0,
+    Sales_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Store_ID, Year, Quarter)
+);
+
+-- AggProductMonth: Revenue by product and month
+CREATE TABLE AggProductMonth (
+    Product_ID VARCHAR(20) NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    Revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    Quantity BIGINT NOT NULL DEFAULT 0,
+    Sales_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Product_ID, Year, Month),
+    INDEX idx_agg_product_period (Year, Month)
+);
+
+-- AggSegmentMonth: Revenue by customer segment (attributes at load time) and month
+CREATE TABLE AggSegmentMonth (
+    Gender VARCHAR(1) NOT NULL DEFAULT '',
+    Age VARCHAR(10) NOT NULL DEFAULT '',
+    City_Category VARCHAR(1) NOT NULL DEFAULT '',
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    Revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    Quantity BIGINT NOT NULL DEFAULT 0,
+    Sales_Count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Gender, Age, City_Category, Year, Month)
 );
 
 -- ============================================================
@@ -116,4 +163,5 @@ CREATE TABLE FactSales (
 -- SELECT COUNT(*) FROM DimProduct;
 -- SELECT COUNT(*) FROM DimDate;
 -- SELECT COUNT(*) FROM DimStore;
--- SELECT COUNT(*) FROM FactSales;
\ No newline at end of file
+-- SELECT COUNT(*) FROM FactSales;
+-- SELECT SUM(Sales_Count) FROM AggStoreQuarter;
\ No newline at end of file
@@ -1,6 +1,12 @@
 """
 Takes user and password for MySQL connector
 Creates DW
+
+With --refresh the existing DW is kept and only master-data changes since the
+last load are applied to the dimensions.
+
+With --rebuild-aggregates the summary tables maintained by the ETL are recomputed
+from FactSales (e.g. after a refresh changed customer segments).
 """
 
 import sys
@@ -10,7 +16,17 @@ from datetime import datetime
 import pandas as pd
 import random
 
+# Aggregate definitions are shared with the ETL loader
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hybrid_join'))
+import aggregates
+
 class DWH:
+    # Secondary indexes built after the initial load: (table, index name, definition).
+    # DimDate.Full_Date is the only one; the other dimensions have just their primary key.
+    DEFERRED_INDEXES = [
+        ("DimDate", "Full_Date", "UNIQUE INDEX Full_Date (Full_Date)"),
+    ]
+
     def __init__(self, user: str, password: str) -> None:
         self.user = user
         self.password = password
@@ -19,42 +35,71 @@ class DWH:
         self.SQL_PATH = os.path.join(script_dir, 'createDW.sql')
         self.CUSTOMER_M_DATA = os.path.join(script_dir, '../../data/customer_master_data.csv')
         self.PRODUCT_M_DATA = os.path.join(script_dir, '../../data/product_master_data.csv')
+        self.TRANSACTION_DATA = os.path.join(script_dir, '../../data/transactional_data.csv')
+        # Row hashes of the last loaded master snapshots, for incremental refresh
+        self.SNAPSHOT_DIR = os.path.join(script_dir, '../../data/.snapshots')
+        self.REFRESH_MARKER = os.path.join(self.SNAPSHOT_DIR, 'REFRESH')
+        self._product_df = None
         self.establish_connection()
 
     # -- Helper Functions -- #
     @staticmethod
-    def generate_tuple_customer(df: pd.DataFrame, index: int) -> tuple:
-
-        row = df.iloc[index]
-
-        Customer_ID = int(row.Customer_ID)
-        gender = str(row.Gender)
-        age = str(row.Age)
-        occupation = int(row.Occupation)
-        City_Category = str(row.City_Category)
-        yrs = str(row.Stay_In_Current_City_Years)
-        Marital_Status = int(row.Marital_Status)
-
-        row_tuple = (Customer_ID, gender, age, occupation, City_Category, yrs, Marital_Status)
-
-        return row_tuple
+    def _nullable(series: pd.Series) -> list:
+        """Column values as Python objects with NaN replaced by None"""
+        return series.astype(object).where(series.notna(), None).tolist()
 
     @staticmethod
-    def generate_tuple_product(df: pd.DataFrame, index: int) -> tuple:
+    def generate_tuples_customer(df: pd.DataFrame) -> list:
+        """Return a DimCustomer tuple for each customer row (column-wise conversion)"""
+        return list(zip(
+            df['Customer_ID'].astype('int64').tolist(),
+            df['Gender'].astype(str).tolist(),
+            df['Age'].astype(str).tolist(),
+            df['Occupation'].astype('int64').tolist(),
+            df['City_Category'].astype(str).tolist(),
+            df['Stay_In_Current_City_Years'].astype(str).tolist(),
+            df['Marital_Status'].astype('int64').tolist()
+        ))
 
-        row = df.iloc[index]
+    @staticmethod
+    def generate_tuples_product(df: pd.DataFrame) -> list:
+        """Return a DimProduct tuple for each product row (column-wise conversion)"""
+        product_ids = df['Product_ID'].astype(str).tolist()
+        categories = DWH._nullable(df['Product_Category'].astype(object))
+        supplier_ids = DWH._nullable(df['supplierID'].astype('Int64'))
+        supplier_names = DWH._nullable(df['supplierName'])
 
-        Product_ID = str(row.Product_ID)
-        Product_Category = str(row.Product_Category) if pd.notna(row.Product_Category) else None
-        Supplier_ID = int(row.supplierID) if pd.notna(row.supplierID) else None
-        Supplier_Name = str(row.supplierName) if pd.notna(row.supplierName) else None
-        
         # Generate random product name based on category
-        Product_Name = DWH.generate_product_name(Product_Category, Product_ID)
+        product_names = [DWH.generate_product_name(category, product_id)
+                         for category, product_id in zip(categories, product_ids)]
 
-        row_tuple = (Product_ID, Product_Category, Product_Name, Supplier_ID, Supplier_Name)
+        return list(zip(product_ids, categories, product_names, supplier_ids, supplier_names))
 
-        return row_tuple
+    @staticmethod
+    def generate_tuples_date(dates: pd.Series) -> list:
+        """Return a DimDate tuple (with calendar attributes) for each distinct date"""
+        dates = pd.to_datetime(dates.drop_duplicates()).drop_duplicates().sort_values()
+        month = dates.dt.month
+        day_of_week = dates.dt.day_name()
+        # Determine season
+        season = month.map({12: 'Winter', 1: 'Winter', 2: 'Winter',
+                            3: 'Spring', 4: 'Spring', 5: 'Spring',
+                            6: 'Summer', 7: 'Summer', 8: 'Summer',
+                            9: 'Fall', 10: 'Fall', 11: 'Fall'})
+
+        return list(zip(
+            dates.dt.strftime('%Y%m%d').astype('int64').tolist(),
+            dates.dt.date.tolist(),
+            dates.dt.day.tolist(),
+            month.tolist(),
+            dates.dt.month_name().tolist(),
+            dates.dt.quarter.tolist(),
+            dates.dt.year.tolist(),
+            day_of_week.tolist(),
+            day_of_week.isin(['Saturday', 'Sunday']).astype(int).tolist(),
+            season.tolist(),
+            dates.dt.isocalendar().week.astype('int64').tolist()
+        ))
     
     @staticmethod
     def generate_product_name(category: str, product_id: str) -> str:
@@ -153,6 +198,42 @@ class DWH:
 
         self.log_db_donfig(log_mssg)
 
+    def read_product_master(self) -> pd.DataFrame:
+        """Read the product master once; DimProduct, DimStore and DimSupplier share it"""
+        if self._product_df is None:
+            self._product_df = pd.read_csv(self.PRODUCT_M_DATA)
+        return self._product_df
+
+    def insert_many(self, query: str, rows: list, label: str, chunk_size: int = 5000) -> int:
+        """
+        Insert rows with executemany in chunks.
+        A failing chunk is retried row by row so only the bad rows are skipped.
+        """
+        inserted = 0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                self.cur.executemany(query, chunk)
+                inserted += len(chunk)
+            except Exception:
+                for row_tup in chunk:
+                    try:
+                        self.cur.execute(query, row_tup)
+                        inserted += 1
+                    except Exception as e:
+                        print(f"Error inserting {label} {row_tup[0]}: {e}")
+            print(f"Inserted {inserted} {label} records...")
+        return inserted
+
+    def distinct_pairs(self, df: pd.DataFrame, id_column: str, name_column: str) -> pd.DataFrame:
+        """Distinct (id, name) pairs of the product master; rows without an id are skipped and logged"""
+        missing = int(df[id_column].isna().sum())
+        if missing:
+            log_mssg = f"Skipped {missing} product rows without {id_column}"
+            print(log_mssg)
+            self.log_db_donfig(log_mssg)
+        return df[[id_column, name_column]].dropna(subset=[id_column]).drop_duplicates()
+
     # -- Main Functions -- #
     def populate_dim_customer(self) -> None:
         """Populate DimCustomer dimension table"""
@@ -160,31 +241,19 @@ class DWH:
             self.establish_connection()
         
         customer_df = pd.read_csv(self.CUSTOMER_M_DATA)
-        inserted = 0
-
-        for index in range(len(customer_df)):
-            row_tup = self.generate_tuple_customer(customer_df, index)
-
-            try:
-                query = """
-                    INSERT INTO walmart_dw.DimCustomer (
-                        Customer_ID,
-                        Gender,
-                        Age,
-                        Occupation,
-                        City_Category,
-                        Stay_In_Current_City_Years,
-                        Marital_Status
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s);
-                """
-                self.cur.execute(query, row_tup)
-                inserted += 1
-                if inserted % 100 == 0:
-                    print(f"Inserted {inserted} customer records...")
-
-            except Exception as e:
-                print(f"Error inserting customer {row_tup[0]}: {e}")
+        query = """
+            INSERT INTO walmart_dw.DimCustomer (
+                Customer_ID,
+                Gender,
+                Age,
+                Occupation,
+                City_Category,
+                Stay_In_Current_City_Years,
+                Marital_Status
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """
+        inserted = self.insert_many(query, self.generate_tuples_customer(customer_df), "customer")
         
         self.conn.commit()
         print(f"DimCustomer table successfully populated with {inserted} records")
@@ -194,30 +263,18 @@ class DWH:
         if not self.conn.is_connected():
             self.establish_connection()
         
-        product_df = pd.read_csv(self.PRODUCT_M_DATA)
-        inserted = 0
-
-        for index in range(len(product_df)):
-            row_tup = self.generate_tuple_product(product_df, index)
-
-            try:
-                query = """
-                    INSERT INTO walmart_dw.DimProduct (
-                        Product_ID,
-                        Product_Category,
-                        Product_Name,
-                        Supplier_ID,
-                        Supplier_Name
-                    )
-                    VALUES (%s, %s, %s, %s, %s);
-                """
-                self.cur.execute(query, row_tup)
-                inserted += 1
-                if inserted % 100 == 0:
-                    print(f"Inserted {inserted} product records...")
-
-            except Exception as e:
-                print(f"Error inserting product {row_tup[0]}: {e}")
+        product_df = self.read_product_master()
+        query = """
+            INSERT INTO walmart_dw.DimProduct (
+                Product_ID,
+                Product_Category,
+                Product_Name,
+                Supplier_ID,
+                Supplier_Name
+            )
+            VALUES (%s, %s, %s, %s, %s);
+        """
+        inserted = self.insert_many(query, self.generate_tuples_product(product_df), "product")
         
         self.conn.commit()
         print(f"DimProduct table successfully populated with {inserted} records")
@@ -227,33 +284,22 @@ class DWH:
         if not self.conn.is_connected():
             self.establish_connection()
         
-        product_df = pd.read_csv(self.PRODUCT_M_DATA)
+        product_df = self.read_product_master()
         # Extract unique stores
-        stores = product_df[['storeID', 'storeName']].drop_duplicates()
-        inserted = 0
-
-        for _, row in stores.iterrows():
-            try:
-                store_id = int(row.storeID)
-                store_name = str(row.storeName)
-                # Extract city category from store name or use default
-                city_category = 'A'  # Default, can be enhanced
-                region = 'Unknown'  # Default, can be enhanced
-
-                query = """
-                    INSERT IGNORE INTO walmart_dw.DimStore (
-                        Store_ID,
-                        Store_Name,
-                        Store_City_Category,
-                        Store_Region
-                    )
-                    VALUES (%s, %s, %s, %s);
-                """
-                self.cur.execute(query, (store_id, store_name, city_category, region))
-                inserted += 1
-
-            except Exception as e:
-                print(f"Error inserting store {row.storeID}: {e}")
+        stores = self.distinct_pairs(product_df, 'storeID', 'storeName')
+        # City category and region default until the source provides them
+        rows = [(store_id, store_name, 'A', 'Unknown') for store_id, store_name in zip(
+            stores['storeID'].astype('int64').tolist(), stores['storeName'].astype(str).tolist())]
+        query = """
+            INSERT IGNORE INTO walmart_dw.DimStore (
+                Store_ID,
+                Store_Name,
+                Store_City_Category,
+                Store_Region
+            )
+            VALUES (%s, %s, %s, %s);
+        """
+        inserted = self.insert_many(query, rows, "store")
         
         self.conn.commit()
         print(f"DimStore table successfully populated with {inserted} records")
@@ -263,28 +309,19 @@ class DWH:
         if not self.conn.is_connected():
             self.establish_connection()
         
-        product_df = pd.read_csv(self.PRODUCT_M_DATA)
+        product_df = self.read_product_master()
         # Extract unique suppliers
-        suppliers = product_df[['supplierID', 'supplierName']].drop_duplicates()
-        inserted = 0
-
-        for _, row in suppliers.iterrows():
-            try:
-                supplier_id = int(row.supplierID)
-                supplier_name = str(row.supplierName)
-
-                query = """
-                    INSERT IGNORE INTO walmart_dw.DimSupplier (
-                        Supplier_ID,
-                        Supplier_Name
-                    )
-                    VALUES (%s, %s);
-                """
-                self.cur.execute(query, (supplier_id, supplier_name))
-                inserted += 1
-
-            except Exception as e:
-                print(f"Error inserting supplier {row.supplierID}: {e}")
+        suppliers = self.distinct_pairs(product_df, 'supplierID', 'supplierName')
+        rows = list(zip(suppliers['supplierID'].astype('int64').tolist(),
+                        suppliers['supplierName'].astype(str).tolist()))
+        query = """
+            INSERT IGNORE INTO walmart_dw.DimSupplier (
+                Supplier_ID,
+                Supplier_Name
+            )
+            VALUES (%s, %s);
+        """
+        inserted = self.insert_many(query, rows, "supplier")
         
         self.conn.commit()
         print(f"DimSupplier table successfully populated with {inserted} records")
@@ -294,63 +331,234 @@ class DWH:
         if not self.conn.is_connected():
             self.establish_connection()
         
-        trans_df = pd.read_csv(os.path.join(os.path.dirname(self.CUSTOMER_M_DATA), 'transactional_data.csv'))
-        # Extract unique dates
-        trans_df['date'] = pd.to_datetime(trans_df['date'])
-        unique_dates = trans_df['date'].drop_duplicates().sort_values()
-        inserted = 0
-
-        for date_val in unique_dates:
-            try:
-                date_id = int(date_val.strftime('%Y%m%d'))
-                day = date_val.day
-                month = date_val.month
-                month_name = date_val.strftime('%B')
-                quarter = (month - 1) // 3 + 1
-                year = date_val.year
-                day_of_week = date_val.strftime('%A')
-                is_weekend = 1 if day_of_week in ['Saturday', 'Sunday'] else 0
-                
-                # Determine season
-                if month in [12, 1, 2]:
-                    season = 'Winter'
-                elif month in [3, 4, 5]:
-                    season = 'Spring'
-                elif month in [6, 7, 8]:
-                    season = 'Summer'
-                else:
-                    season = 'Fall'
-                
-                week_of_year = date_val.isocalendar()[1]
-
-                query = """
-                    INSERT IGNORE INTO walmart_dw.DimDate (
-                        Date_ID,
-                        Full_Date,
-                        Day,
-                        Month,
-                        Month_Name,
-                        Quarter,
-                        Year,
-                        Day_Of_Week,
-                        Is_Weekend,
-                        Season,
-                        Week_Of_Year
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-                """
-                self.cur.execute(query, (date_id, date_val.date(), day, month, month_name, 
-                                       quarter, year, day_of_week, is_weekend, season, week_of_year))
-                inserted += 1
-                if inserted % 100 == 0:
-                    print(f"Inserted {inserted} date records...")
-
-            except Exception as e:
-                print(f"Error inserting date {date_val}: {e}")
+        # Only the date column is needed, reduced to distinct strings before parsing
+        trans_dates = pd.read_csv(self.TRANSACTION_DATA, usecols=['date'], dtype={'date': 'str'})['date']
+        query = """
+            INSERT IGNORE INTO walmart_dw.DimDate (
+                Date_ID,
+                Full_Date,
+                Day,
+                Month,
+                Month_Name,
+                Quarter,
+                Year,
+                Day_Of_Week,
+                Is_Weekend,
+                Season,
+                Week_Of_Year
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+        """
+        inserted = self.insert_many(query, self.generate_tuples_date(trans_dates), "date")
         
         self.conn.commit()
         print(f"DimDate table successfully populated with {inserted} records")
 
+    def bulk_load(self) -> None:
+        """
+        Initial load of all dimensions.
+        Only two things are deferred until every dimension is in place: foreign_key_checks
+        and the DimDate Full_Date index (DEFERRED_INDEXES). Everything else, unique checks
+        included (the INSERT IGNORE loads rely on them), works as in a normal insert.
+        """
+        if not self.conn.is_connected():
+            self.establish_connection()
+        
+        self.cur.execute("SET foreign_key_checks = 0")
+        for table, index, definition in self.DEFERRED_INDEXES:
+            self.cur.execute(f"ALTER TABLE walmart_dw.{table} DROP INDEX {index}")
+        
+        try:
+            print('Populating DimCustomer...')
+            self.populate_dim_customer()
+            print('Populating DimProduct...')
+            self.populate_dim_product()
+            print('Populating DimStore...')
+            self.populate_dim_store()
+            print('Populating DimSupplier...')
+            self.populate_dim_supplier()
+            print('Populating DimDate...')
+            self.populate_dim_date()
+        finally:
+            for table, index, definition in self.DEFERRED_INDEXES:
+                self.cur.execute(f"ALTER TABLE walmart_dw.{table} ADD {definition}")
+            self.cur.execute("SET foreign_key_checks = 1")
+        
+        self.save_snapshot("customer", pd.read_csv(self.CUSTOMER_M_DATA), "Customer_ID")
+        self.save_snapshot("product", self.read_product_master(), "Product_ID")
+        self.log_db_donfig("Dimensions bulk loaded")
+
+    # -- Incremental Refresh (CDC) -- #
+    @staticmethod
+    def row_hashes(df: pd.DataFrame, key: str) -> pd.DataFrame:
+        """One hash per master row, keyed by its business key"""
+        return pd.DataFrame({
+            key: df[key].values,
+            'row_hash': pd.util.hash_pandas_object(df, index=False).values
+        })
+
+    def snapshot_path(self, name: str) -> str:
+        return os.path.join(self.SNAPSHOT_DIR, f"{name}.csv")
+
+    def save_snapshot(self, name: str, df: pd.DataFrame, key: str) -> None:
+        """Record the row hashes of a master snapshot for the next refresh"""
+        os.makedirs(self.SNAPSHOT_DIR, exist_ok=True)
+        path = self.snapshot_path(name)
+        self.row_hashes(df, key).to_csv(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+    def diff_snapshot(self, name: str, df: pd.DataFrame, key: str) -> tuple:
+        """
+        Compare a master snapshot with the previous one by row hash.
+        Returns (rows inserted or updated, keys deleted).
+        """
+        new = self.row_hashes(df, key)
+        path = self.snapshot_path(name)
+        if os.path.exists(path):
+            old = pd.read_csv(path, dtype={key: new[key].dtype, 'row_hash': 'uint64'})
+        else:
+            old = new.iloc[0:0]
+
+        merged = new.merge(old, on=key, how='outer', suffixes=('', '_old'), indicator=True)
+        changed = merged[(merged['_merge'] == 'left_only') |
+                         ((merged['_merge'] == 'both') & (merged['row_hash'] != merged['row_hash_old']))]
+        deleted = merged.loc[merged['_merge'] == 'right_only', key].tolist()
+        return df[df[key].isin(changed[key])], deleted
+
+    def delete_many(self, table: str, key: str, keys: list, label: str, chunk_size: int = 1000) -> int:
+        """
+        Delete dimension rows in chunks.
+        Rows still referenced by FactSales (FK RESTRICT) are skipped and reported.
+        """
+        deleted = 0
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            query = f"DELETE FROM walmart_dw.{table} WHERE {key} IN ({', '.join(['%s'] * len(chunk))})"
+            try:
+                self.cur.execute(query, chunk)
+                deleted += self.cur.rowcount
+            except Exception:
+                for value in chunk:
+                    try:
+                        self.cur.execute(f"DELETE FROM walmart_dw.{table} WHERE {key} = %s", (value,))
+                        deleted += self.cur.rowcount
+                    except Exception as e:
+                        print(f"Kept {label} {value}: {e}")
+        return deleted
+
+    def refresh_dimensions(self) -> None:
+        """
+        Incremental refresh of DimCustomer, DimProduct, DimStore and DimSupplier.
+        The current master snapshots are diffed against the previous ones and only
+        inserts, updates and deletes are applied, as batched upserts; FactSales is untouched.
+        """
+        if not self.conn.is_connected():
+            self.establish_connection()
+
+        customer_df = pd.read_csv(self.CUSTOMER_M_DATA)
+        self._product_df = None
+        product_df = self.read_product_master()
+        customer_changes, customer_deleted = self.diff_snapshot("customer", customer_df, "Customer_ID")
+        product_changes, product_deleted = self.diff_snapshot("product", product_df, "Product_ID")
+
+        try:
+            # Inserts and updates
+            customers = self.insert_many("""
+                INSERT INTO walmart_dw.DimCustomer (
+                    Customer_ID, Gender, Age, Occupation, City_Category,
+                    Stay_In_Current_City_Years, Marital_Status
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    Gender = VALUES(Gender),
+                    Age = VALUES(Age),
+                    Occupation = VALUES(Occupation),
+                    City_Category = VALUES(City_Category),
+                    Stay_In_Current_City_Years = VALUES(Stay_In_Current_City_Years),
+                    Marital_Status = VALUES(Marital_Status);
+            """, self.generate_tuples_customer(customer_changes), "customer")
+
+            stores = product_changes[['storeID', 'storeName']].drop_duplicates()
+            self.insert_many("""
+                INSERT INTO walmart_dw.DimStore (Store_ID, Store_Name, Store_City_Category, Store_Region)
+                VALUES (%s, %s, 'A', 'Unknown')
+                ON DUPLICATE KEY UPDATE Store_Name = VALUES(Store_Name);
+            """, list(zip(stores['storeID'].astype('int64').tolist(), stores['storeName'].astype(str).tolist())),
+                "store")
+
+            suppliers = product_changes[['supplierID', 'supplierName']].drop_duplicates()
+            self.insert_many("""
+                INSERT INTO walmart_dw.DimSupplier (Supplier_ID, Supplier_Name)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE Supplier_Name = VALUES(Supplier_Name);
+            """, list(zip(suppliers['supplierID'].astype('int64').tolist(),
+                          suppliers['supplierName'].astype(str).tolist())), "supplier")
+
+            # Existing products keep their generated Product_Name
+            products = self.insert_many("""
+                INSERT INTO walmart_dw.DimProduct (
+                    Product_ID, Product_Category, Product_Name, Supplier_ID, Supplier_Name
+                )
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    Product_Category = VALUES(Product_Category),
+                    Supplier_ID = VALUES(Supplier_ID),
+                    Supplier_Name = VALUES(Supplier_Name);
+            """, self.generate_tuples_product(product_changes), "product")
+
+            # Deletes: facts first block removal of referenced rows
+            removed = self.delete_many("DimProduct", "Product_ID", product_deleted, "product")
+            removed += self.delete_many("DimCustomer", "Customer_ID", customer_deleted, "customer")
+
+            self.cur.execute("SELECT Store_ID FROM walmart_dw.DimStore")
+            live_stores = set(product_df['storeID'].astype('int64').tolist())
+            stale_stores = [row[0] for row in self.cur.fetchall() if row[0] not in live_stores]
+            removed += self.delete_many("DimStore", "Store_ID", stale_stores, "store")
+
+            self.cur.execute("SELECT Supplier_ID FROM walmart_dw.DimSupplier")
+            live_suppliers = set(product_df['supplierID'].astype('int64').tolist())
+            stale_suppliers = [row[0] for row in self.cur.fetchall() if row[0] not in live_suppliers]
+            removed += self.delete_many("DimSupplier", "Supplier_ID", stale_suppliers, "supplier")
+
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            log_mssg = f"Incremental refresh failed: {e}"
+            print(log_mssg)
+            self.log_db_donfig(log_mssg)
+            raise
+
+        self.save_snapshot("customer", customer_df, "Customer_ID")
+        self.save_snapshot("product", product_df, "Product_ID")
+        self.signal_refresh()
+
+        log_mssg = (f"Incremental refresh: {customers} customers and {products} products upserted, "
+                    f"{removed} dimension rows deleted")
+        print(log_mssg)
+        self.log_db_donfig(log_mssg)
+
+    def rebuild_aggregates(self) -> None:
+        """Recompute the aggregate tables from FactSales (run while the ETL is stopped)"""
+        if not self.conn.is_connected():
+            self.establish_connection()
+        try:
+            counts = aggregates.rebuild(self.conn)
+        except Exception as e:
+            log_mssg = f"Aggregate rebuild failed: {e}"
+            print(log_mssg)
+            self.log_db_donfig(log_mssg)
+            raise
+
+        log_mssg = f"Aggregates rebuilt from FactSales: {counts}"
+        print(log_mssg)
+        self.log_db_donfig(log_mssg)
+
+    def signal_refresh(self) -> None:
+        """Touch the refresh marker so a running ETL reloads its master data"""
+        os.makedirs(self.SNAPSHOT_DIR, exist_ok=True)
+        with open(self.REFRESH_MARKER, "w", encoding="utf-8") as file:
+            file.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
     def close_connection(self) -> None:
         """Close database connection"""
         if hasattr(self, 'cur') and self.cur:
@@ -361,11 +569,24 @@ class DWH:
 
 if __name__=="__main__":
 
+    refresh: bool = "--refresh" in sys.argv[1:]
+    rebuild: bool = "--rebuild-aggregates" in sys.argv[1:]
     # Taking User input
     user: str = input("User (e.g root): ")
     password: str = input("Password: ")
     # DWH Object
     data_warehouse = DWH(user, password)
+    if refresh:
+        # Incremental dimension refresh, no rebuild
+        print('Refreshing dimensions')
+        data_warehouse.refresh_dimensions()
+        data_warehouse.close_connection()
+        sys.exit(0)
+    if rebuild:
+        print('Rebuilding aggregates')
+        data_warehouse.rebuild_aggregates()
+        data_warehouse.close_connection()
+        sys.exit(0)
     # Creating DB
     print('Creating Data Warehouse')
     data_warehouse.create_dw()
@@ -374,16 +595,7 @@ if __name__=="__main__":
     
     # Populate DW
     print('Populating Data Warehouse')
-    print('Populating DimCustomer...')
-    data_warehouse.populate_dim_customer()
-    print('Populating DimProduct...')
-    data_warehouse.populate_dim_product()
-    print('Populating DimStore...')
-    data_warehouse.populate_dim_store()
-    print('Populating DimSupplier...')
-    data_warehouse.populate_dim_supplier()
-    print('Populating DimDate...')
-    data_warehouse.populate_dim_date()
+    data_warehouse.bulk_load()
     
     # Close connection
     data_warehouse.close_connection()
@@ -0,0 +1,171 @@
+"""
+Adaptive Controller: Resizes the hash-table budget (hS) and the customer partition size at
+runtime, within configured bounds, to maximise output tuples per second.
+
+Every interval seconds it observes
+    - stream arrival rate and output (committed) rate
+    - matches produced per partition load
+    - stream backlog and backpressure
+    - memory headroom (resident set size against memory_limit_mb)
+and makes at most one decision:
+    1. over 90% of the memory limit: shrink hS
+    2. saturated (backlog above hS or the feeder throttled): hill-climb on the output rate,
+       alternating between hS and the partition size; a step that lowered the output rate
+       reverses the direction of that knob
+    3. not saturated and partition loads mostly wasted (few matches per loaded record):
+       shrink the partition size
+Every decision (including "hold") is logged with its observations to logs/Adaptive_controller.log.
+"""
+
+import os
+import time
+from datetime import datetime
+
+class AdaptiveController:
+    def __init__(self, etl, hs_bounds: tuple = (1000, 100000), partition_bounds: tuple = (250, 4000),
+                 interval: float = 2.0, step: float = 1.5, memory_limit_mb: float = None,
+                 min_yield: float = 0.02, tolerance: float = 0.02):
+        self.etl = etl
+        self.bounds = {"hS": hs_bounds, "partition_size": partition_bounds}
+        store = etl.customer_disk_buffer.store
+        if store is not None:
+            # A page store moves the partition size in whole pages
+            page = store.page_size
+            low = max(page, round(partition_bounds[0] / page) * page)
+            high = max(low, round(partition_bounds[1] / page) * page)
+            self.bounds["partition_size"] = (low, high)
+        self.interval = interval
+        self.step = step
+        self.memory_limit_mb = memory_limit_mb
+        self.min_yield = min_yield  # matches per loaded master record below which I/O is wasted
+        self.tolerance = tolerance
+
+        self.direction = {"hS": 1, "partition_size": 1}
+        self.next_knob = "hS"
+        self.last_change = None  # knob changed by the previous decision
+        self.last_rate = None  # output rate observed before that change
+        self.decisions = 0
+
+        self.checked = time.monotonic()
+        self.previous = self._counters()
+
+    @staticmethod
+    def log_decision(message: str) -> None:
+        script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        log_dir = os.path.join(script_dir, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, 'Adaptive_controller.log')
+        # Writing to log file
+        with open(log_path, "a", encoding="utf-8") as file:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            file.write(f"[{timestamp}] - {message}\n")
+
+    @staticmethod
+    def resident_mb() -> float | None:
+        """Current resident set size in MB (Linux), None if unknown"""
+        try:
+            with open("/proc/self/statm") as file:
+                pages = int(file.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _counters(self) -> dict:
+        etl = self.etl
+        return {
+            "pushed": etl.stream_buffer.pushed,
+            "loaded": etl.loaded_count,
+            "loads": etl.partition_loads.value(),
+            "matched": etl.matched.value(),
+            "throttled": etl.stream_buffer.throttled_seconds,
+        }
+
+    def current(self, knob: str) -> int:
+        return self.etl.hash_table.hS if knob == "hS" else self.etl.customer_disk_buffer.partition_size
+
+    def apply(self, knob: str, value: int) -> int:
+        """Set a knob; returns the value actually in effect"""
+        if knob == "hS":
+            self.etl.hash_table.hS = value
+        else:
+            value = self.etl.customer_disk_buffer.set_partition_size(value)
+            self.etl.partition_size = value
+        return value
+
+    def observe(self) -> dict:
+        now = time.monotonic()
+        elapsed = max(now - self.checked, 1e-9)
+        counters = self._counters()
+        delta = {name: counters[name] - self.previous[name] for name in counters}
+        self.checked, self.previous = now, counters
+
+        partition_size = self.current("partition_size")
+        return {
+            "arrival_rate": round(delta["pushed"] / elapsed, 1),
+            "output_rate": round(delta["loaded"] / elapsed, 1),
+            "matches_per_load": round(delta["matched"] / delta["loads"], 2) if delta["loads"] else 0.0,
+            "yield": round(delta["matched"] / (delta["loads"] * partition_size), 4) if delta["loads"] else 0.0,
+            "backlog": self.etl.stream_buffer.size(),
+            "throttled": round(delta["throttled"], 3),
+            "rss_mb": self.resident_mb(),
+            "hS": self.current("hS"),
+            "partition_size": partition_size,
+        }
+
+    def _stepped(self, knob: str, direction: int) -> int:
+        low, high = self.bounds[knob]
+        factor = self.step if direction > 0 else 1 / self.step
+        return int(min(high, max(low, round(self.current(knob) * factor))))
+
+    def decide(self, obs: dict) -> tuple | None:
+        """Return (knob, new value, reason) or None to hold"""
+        # 1. Memory headroom
+        if self.memory_limit_mb and obs["rss_mb"] and obs["rss_mb"] > 0.9 * self.memory_limit_mb:
+            value = self._stepped("hS", -1)
+            if value != obs["hS"]:
+                return "hS", value, "memory headroom below 10%"
+            return None
+
+        saturated = obs["backlog"] > obs["hS"] or obs["throttled"] > 0
+        if saturated:
+            # 2. Hill-climb on the output rate
+            if self.last_change and self.last_rate is not None \
+                    and obs["output_rate"] < self.last_rate * (1 - self.tolerance):
+                self.direction[self.last_change] *= -1
+            knob = self.next_knob
+            self.next_knob = "partition_size" if knob == "hS" else "hS"
+            value = self._stepped(knob, self.direction[knob])
+            if value == obs[knob]:
+                # At a bound: turn around
+                self.direction[knob] *= -1
+                value = self._stepped(knob, self.direction[knob])
+            return knob, value, "saturated, climbing output rate"
+
+        # 3. Wasted partition I/O while keeping up
+        if obs["matches_per_load"] and obs["yield"] < self.min_yield:
+            value = self._stepped("partition_size", -1)
+            if value != obs["partition_size"]:
+                return "partition_size", value, "few matches per loaded record"
+        return None
+
+    def maybe_adjust(self) -> bool:
+        """Observe and make at most one decision every interval seconds; returns True if a knob changed"""
+        if time.monotonic() - self.checked < self.interval:
+            return False
+        obs = self.observe()
+        decision = self.decide(obs)
+        if decision is not None:
+            knob, value, reason = decision
+            value = self.apply(knob, value)
+            if value == obs[knob]:
+                # Rounded back to the current value: nothing changed
+                decision = None
+        if decision is None:
+            self.last_change = None
+            self.log_decision(f"hold: {obs}")
+            return False
+
+        self.last_change, self.last_rate = knob, obs["output_rate"]
+        self.decisions += 1
+        self.log_decision(f"{knob} {obs[knob]} -> {value} ({reason}): {obs}")
+        return True
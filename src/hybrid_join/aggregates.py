@@ -0,0 +1,99 @@
+"""
+Aggregates: Summary tables of FactSales that the ETL keeps up to date, so the OLAP queries
+read a few thousand pre-aggregated rows instead of re-aggregating FactSales on every run.
+    AggStoreQuarter   revenue, quantity and sales per Store_ID x year x quarter
+    AggProductMonth   revenue, quantity and sales per Product_ID x year x month
+    AggSegmentMonth   revenue, quantity and sales per customer segment
+                      (Gender x Age x City_Category) x year x month
+
+With aggregates enabled (main.py --aggregates), FactLoader writes each batch into a
+session-private staging table, deletes the Order_IDs already in FactSales (tuples replayed
+after a resume from checkpoint), adds the batch's totals to every aggregate with upserts and
+then moves the rows into FactSales, all in the batch's transaction: the aggregates change
+exactly when the facts do. The queries reading them are in sql_queries/aggregate_queries.sql.
+
+Segments use the customer attributes at load time. rebuild() recomputes every aggregate
+from FactSales, e.g. after a dimension refresh changed customer attributes (run it while
+the ETL is stopped).
+"""
+
+STAGE_TABLE = "walmart_dw.FactStage"
+
+# Same columns and types as FactSales, without its foreign keys
+CREATE_STAGE_QUERY = f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGE_TABLE} LIKE walmart_dw.FactSales"
+
+# Replayed rows are neither counted nor loaded again
+DEDUPLICATE_STAGE_QUERY = f"""
+    DELETE s FROM {STAGE_TABLE} s
+    JOIN walmart_dw.FactSales f ON f.Order_ID = s.Order_ID
+"""
+
+CLEAR_STAGE_QUERY = f"DELETE FROM {STAGE_TABLE}"
+
+# Upserts of one source's totals, keyed by each table's primary key ({source} is the
+# staging table or FactSales). Target columns are qualified in the UPDATE clause because
+# the source has a Quantity column too. Groups are written in key order to keep lock
+# order stable between concurrent writers.
+AGGREGATE_QUERIES = {
+    "AggStoreQuarter": """
+        INSERT INTO walmart_dw.AggStoreQuarter (Store_ID, Year, Quarter, Revenue, Quantity, Sales_Count)
+        SELECT s.Store_ID, d.Year, d.Quarter, SUM(s.Purchase_Amount), SUM(s.Quantity), COUNT(*)
+        FROM {source} s
+        JOIN walmart_dw.DimDate d ON d.Date_ID = s.Date_ID
+        GROUP BY s.Store_ID, d.Year, d.Quarter
+        ORDER BY s.Store_ID, d.Year, d.Quarter
+        ON DUPLICATE KEY UPDATE
+            Revenue = AggStoreQuarter.Revenue + VALUES(Revenue),
+            Quantity = AggStoreQuarter.Quantity + VALUES(Quantity),
+            Sales_Count = AggStoreQuarter.Sales_Count + VALUES(Sales_Count)
+    """,
+    "AggProductMonth": """
+        INSERT INTO walmart_dw.AggProductMonth (Product_ID, Year, Month, Revenue, Quantity, Sales_Count)
+        SELECT s.Product_ID, d.Year, d.Month, SUM(s.Purchase_Amount), SUM(s.Quantity), COUNT(*)
+        FROM {source} s
+        JOIN walmart_dw.DimDate d ON d.Date_ID = s.Date_ID
+        GROUP BY s.Product_ID, d.Year, d.Month
+        ORDER BY s.Product_ID, d.Year, d.Month
+        ON DUPLICATE KEY UPDATE
+            Revenue = AggProductMonth.Revenue + VALUES(Revenue),
+            Quantity = AggProductMonth.Quantity + VALUES(Quantity),
+            Sales_Count = AggProductMonth.Sales_Count + VALUES(Sales_Count)
+    """,
+    "AggSegmentMonth": """
+        INSERT INTO walmart_dw.AggSegmentMonth (Gender, Age, City_Category, Year, Month,
+                                                Revenue, Quantity, Sales_Count)
+        SELECT COALESCE(c.Gender, ''), COALESCE(c.Age, ''), COALESCE(c.City_Category, ''), d.Year, d.Month,
+               SUM(s.Purchase_Amount), SUM(s.Quantity), COUNT(*)
+        FROM {source} s
+        JOIN walmart_dw.DimCustomer c ON c.Customer_ID = s.Customer_ID
+        JOIN walmart_dw.DimDate d ON d.Date_ID = s.Date_ID
+        GROUP BY c.Gender, c.Age, c.City_Category, d.Year, d.Month
+        ORDER BY c.Gender, c.Age, c.City_Category, d.Year, d.Month
+        ON DUPLICATE KEY UPDATE
+            Revenue = AggSegmentMonth.Revenue + VALUES(Revenue),
+            Quantity = AggSegmentMonth.Quantity + VALUES(Quantity),
+            Sales_Count = AggSegmentMonth.Sales_Count + VALUES(Sales_Count)
+    """,
+}
+
+def increment_queries() -> list:
+    """Statements that add the staged batch to every aggregate"""
+    return [query.format(source=STAGE_TABLE) for query in AGGREGATE_QUERIES.values()]
+
+def rebuild(conn) -> dict:
+    """Recompute every aggregate from FactSales in one transaction; returns rows per table"""
+    cur = conn.cursor()
+    counts = {}
+    try:
+        for table, query in AGGREGATE_QUERIES.items():
+            cur.execute(f"DELETE FROM walmart_dw.{table}")
+            cur.execute(query.format(source="walmart_dw.FactSales"))
+            cur.execute(f"SELECT COUNT(*) FROM walmart_dw.{table}")
+            counts[table] = cur.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return counts
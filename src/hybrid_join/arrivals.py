@@ -0,0 +1,89 @@
+"""
+Arrival Profiles: Pace the stream feeder. A profile returns the inter-arrival gap (seconds)
+before each tuple of a batch; a Pacer sleeps until the batch is due on an absolute
+schedule, so pacing does not drift with the time spent pushing. The stream feeder and the
+parallel dispatcher pace their batches the same way.
+
+    constant - fixed rate (tuples per second)
+    poisson  - exponential gaps with the given mean rate
+    bursts   - base rate, raised to burst_rate for burst_seconds at the start of every period
+    replay   - gaps between the original transaction dates, compressed by speedup
+               (one day of history = 86400 / speedup seconds); out-of-order dates arrive at once
+"""
+
+import time
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+
+class ConstantRate:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.mean_rate = rate
+
+    def gaps(self, batch: list, elapsed: float) -> np.ndarray:
+        return np.full(len(batch), 1.0 / self.rate)
+
+class Poisson:
+    def __init__(self, rate: float, seed: int = None):
+        self.rate = rate
+        self.mean_rate = rate
+        self.rng = np.random.default_rng(seed)
+
+    def gaps(self, batch: list, elapsed: float) -> np.ndarray:
+        return self.rng.exponential(1.0 / self.rate, len(batch))
+
+class Bursts:
+    def __init__(self, rate: float, burst_rate: float = None, period: float = 10.0, burst_seconds: float = 1.0):
+        self.rate = rate
+        self.burst_rate = burst_rate or rate * 10
+        self.period = period
+        self.burst_seconds = burst_seconds
+        burst_share = min(burst_seconds / period, 1.0)
+        self.mean_rate = self.rate * (1 - burst_share) + self.burst_rate * burst_share
+
+    def gaps(self, batch: list, elapsed: float) -> np.ndarray:
+        in_burst = elapsed % self.period < self.burst_seconds
+        return np.full(len(batch), 1.0 / (self.burst_rate if in_burst else self.rate))
+
+class Replay:
+    def __init__(self, speedup: float = SECONDS_PER_DAY, date_index: int = 4):
+        self.speedup = speedup
+        self.date_index = date_index
+        self.previous = None  # date of the last tuple, as a day number
+        self.mean_rate = None  # depends on the data
+
+    def gaps(self, batch: list, elapsed: float) -> np.ndarray:
+        days = np.array([row[self.date_index] for row in batch], dtype="datetime64[D]").astype(np.int64)
+        previous = days[0] if self.previous is None else self.previous
+        self.previous = days[-1]
+        deltas = np.diff(days, prepend=previous)
+        return np.maximum(deltas, 0) * (SECONDS_PER_DAY / self.speedup)
+
+class Pacer:
+    """Holds each batch back until it is due under an arrival profile"""
+    def __init__(self, arrivals):
+        self.arrivals = arrivals
+        self.started = self.due = time.monotonic()
+
+    def wait(self, batch: list) -> None:
+        """Sleep until batch is due (its gaps added to the previous batch's due time)"""
+        self.due += float(self.arrivals.gaps(batch, self.due - self.started).sum())
+        wait = self.due - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+PROFILES = {
+    "constant": ConstantRate,
+    "poisson": Poisson,
+    "bursts": Bursts,
+    "replay": Replay,
+}
+
+def make_profile(name: str, rate: float = None, **kwargs):
+    """Build an arrival profile by name (for replay, rate is the speedup)"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown arrival profile: {name}")
+    if name == "replay":
+        return Replay(rate or SECONDS_PER_DAY, **kwargs)
+    return PROFILES[name](rate, **kwargs)
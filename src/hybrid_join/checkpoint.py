@@ -0,0 +1,62 @@
+"""
+Checkpoint: Periodic, atomic snapshots of the ETL's in-flight state so a killed process
+can resume instead of replaying the stream from row 0. A checkpoint records
+    - the stream offset (rows of transactional_data.csv already read by the feeder)
+    - every stream tuple read but not yet committed: still in the stream buffer, pending
+      in the hash table/queue, or in a DW batch awaiting commit
+    - the last committed Order_ID
+It is taken by the join thread between iterations, so no tuple is in transit between
+structures. FactSales loads are idempotent on Order_ID, so a tuple recorded here and also
+committed before the crash is simply skipped on replay.
+"""
+
+import os
+import time
+import pickle
+
+VERSION = 2  # 2: stream tuples carry their arrival time
+
+class Checkpointer:
+    def __init__(self, path: str, interval: float = 10.0):
+        self.path = path
+        self.interval = interval
+        self.last_saved = time.monotonic()
+        self.saves = 0
+
+    def maybe_save(self, etl) -> bool:
+        """Save a checkpoint if interval seconds have passed since the last one"""
+        if time.monotonic() - self.last_saved < self.interval:
+            return False
+        self.save(etl)
+        return True
+
+    def save(self, etl) -> None:
+        """Write the current state atomically (temp file, fsync, rename)"""
+        offset, buffered = etl.stream_buffer.snapshot()
+        state = {
+            "version": VERSION,
+            "saved_at": time.time(),
+            "stream_offset": offset,
+            "pending": etl.hash_table.snapshot() + buffered,
+            "last_order_id": etl.last_order_id,
+        }
+
+        tmp_path = self.path + ".tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(tmp_path, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+        self.saves += 1
+
+    def load(self) -> dict | None:
+        """Return the last checkpoint, or None if there is none"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as file:
+            state = pickle.load(file)
+        if state.get("version") != VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {self.path}")
+        return state
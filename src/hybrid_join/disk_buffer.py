@@ -1,55 +1,133 @@
 """
 Disk Buffer: A memory buffer that holds a loaded partition p of size vP from R. This is
 part of the "Join Window." Each disk partition size will be 500 tuples.
+
+R is sorted on the join key once at construction and split into fixed partitions of
+partition_size rows. The first key of every partition is kept as a sorted index, so a
+probe is a binary search followed by a copy of that one partition.
+
+If r_path is a page store (see page_store.py) R stays on disk: the file is memory-mapped,
+each page is one partition, and only the page a probe needs is decoded.
+
+An optional PartitionCache keeps recently decoded partitions for reuse.
+
+The partition size can be changed at runtime (set_partition_size). For a page store a
+partition is then a run of consecutive pages, so the size moves in whole pages.
 """
 
+from bisect import bisect_left, bisect_right
 import pandas as pd
+from page_store import PageStore, EXTENSION
 
 class DiskBuffer:
-    def __init__(self, r_path, partition_size=500, key_column=None):
+    def __init__(self, r_path, partition_size=500, key_column=None, cache=None):
+        self.store = None
+        self.df = None
+        self.cache = cache
+        self.pages_per_partition = 1
+
+        if str(r_path).endswith(EXTENSION):
+            # Out-of-core R: partitions are the pages of the store
+            self.store = PageStore(r_path)
+            self.key_column = self.store.key_column
+            self.partition_size = self.store.page_size
+            return
+
         self.df = pd.read_csv(r_path)
         self.partition_size = partition_size
-        
+
         # Determine key column automatically or use provided
         if key_column:
             self.key_column = key_column
         elif "Customer_ID" in self.df.columns:
             self.key_column = "Customer_ID"
-            self.df = self.df.sort_values("Customer_ID")
         elif "Product_ID" in self.df.columns:
             self.key_column = "Product_ID"
-            self.df = self.df.sort_values("Product_ID")
         else:
             # Use first column as key
             self.key_column = self.df.columns[0]
-            self.df = self.df.sort_values(self.key_column)
+
+        # Sort R on the join key and build the partition index
+        self.df = self.df.sort_values(self.key_column, kind="stable").reset_index(drop=True)
+        self.keys = self.df[self.key_column].tolist()
+        self.boundaries = self.keys[::self.partition_size]  # first key of each partition
+
+    def set_partition_size(self, partition_size: int) -> int:
+        """Change the partition size (rounded to whole pages for a page store); returns the new size"""
+        if self.store is not None:
+            self.pages_per_partition = max(1, round(partition_size / self.store.page_size))
+            self.partition_size = self.pages_per_partition * self.store.page_size
+        else:
+            self.partition_size = max(1, partition_size)
+            self.boundaries = self.keys[::self.partition_size]
+        # Partition numbers have changed
+        if self.cache is not None:
+            self.cache.clear()
+        return self.partition_size
+
+    def close(self) -> None:
+        """Release the page store mapping and cached partitions"""
+        if self.store is not None:
+            self.store.close()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _coerce_key(self, key):
+        """Match the key type to the key column"""
+        if self.key_column == "Customer_ID":
+            return int(key)
+        elif self.key_column == "Product_ID":
+            return str(key)
+        return key
+
+    def partition_index(self, key) -> int | None:
+        """
+        Return the index of the partition holding key, or None if key is not in R.
+        For a page store the covering page is returned without decoding it.
+        """
+        key = self._coerce_key(key)
+        if self.store is not None:
+            page = self.store.find_page(key)
+            return None if page is None else page // self.pages_per_partition
+
+        index = bisect_right(self.boundaries, key) - 1
+        if index < 0:
+            return None
+        # Confirm the key is present inside that partition
+        start = index * self.partition_size
+        end = min(len(self.keys), start + self.partition_size)
+        pos = bisect_left(self.keys, key, start, end)
+        if pos == end or self.keys[pos] != key:
+            return None
+        return index
+
+    def read_partition(self, index: int) -> list:
+        """Return the records of partition number index"""
+        if self.store is not None:
+            if self.pages_per_partition == 1:
+                return self.store.read_page(index)
+            first = index * self.pages_per_partition
+            last = min(len(self.store), first + self.pages_per_partition)
+            return [record for page in range(first, last) for record in self.store.read_page(page)]
+
+        start = index * self.partition_size
+        end = min(len(self.keys), start + self.partition_size)
+        return self.df.iloc[start:end].to_dict("records")
 
     def load_partition(self, key) -> list:
         """
-        Return a partition (slice of dataframe) centered on the key.
+        Return the fixed partition that contains the key.
         For Customer_ID: returns matching customer records
         For Product_ID: returns matching product records
         """
-        # Check if key is int or str based on column type
-        if self.key_column == "Customer_ID":
-            key = int(key)
-        elif self.key_column == "Product_ID":
-            key = str(key)
-        
-        # All tuples in R that match the key
-        block = self.df[self.df[self.key_column] == key]
-
-        if block.empty:
+        index = self.partition_index(key)
+        if index is None:
             return []
+        if self.cache is None:
+            return self.read_partition(index)
 
-        # For exact matches, return all matching records
-        # For partition-based approach, return surrounding records
-        if len(block) <= self.partition_size:
-            # Return all matches plus surrounding context
-            first_idx = block.index[0]
-            start = max(0, first_idx - self.partition_size // 2)
-            end = min(len(self.df), start + self.partition_size)
-            return self.df.iloc[start:end].to_dict("records")
-        else:
-            # Too many matches, return first partition_size
-            return block.iloc[:self.partition_size].to_dict("records")
+        records = self.cache.get(index)
+        if records is None:
+            records = self.read_partition(index)
+            self.cache.put(index, records)
+        return records
@@ -0,0 +1,207 @@
+"""
+Fact Loader: A micro-batching sink for FactSales. Enriched rows are collected and written
+in one statement per batch, either with executemany or with a bulk LOAD DATA LOCAL INFILE.
+A batch is flushed when it reaches batch_size rows or when its oldest row has waited
+max_latency seconds, whichever comes first.
+
+A failed batch is retried, then bisected so that one bad row does not drop the whole
+batch. Every row carries a token (its stream tuple); on_commit(committed, failed, loaded) is
+called with the tokens of each batch once its fate is final, so the caller can release them,
+and with the number of rows the batch added to FactSales.
+
+Loads are idempotent on Order_ID (unique in FactSales): a row that is already present is
+skipped, so tuples replayed after a resume from checkpoint are not loaded twice. Only the
+rows a batch actually inserted count as loaded.
+
+With aggregates (see aggregates.py, opt-in) a batch is written to a staging table first;
+its new rows are added to the summary tables and moved to FactSales in the same
+transaction. Only the moved rows count, not replayed orders dropped from the stage.
+
+An optional group_commit (see writer_pool.py) aligns the COMMITs of concurrent loaders.
+Write and commit times are observed in write_timer/commit_timer (metrics Histograms) if given.
+"""
+
+import os
+import csv
+import time
+from time import perf_counter
+import tempfile
+from aggregates import (STAGE_TABLE, CREATE_STAGE_QUERY, DEDUPLICATE_STAGE_QUERY, CLEAR_STAGE_QUERY,
+                        increment_queries)
+
+FACT_COLUMNS = (
+    "Order_ID",
+    "Customer_ID",
+    "Product_ID",
+    "Date_ID",
+    "Store_ID",
+    "Purchase_Amount",
+    "Quantity",
+)
+
+# {table} is FactSales or the aggregates' staging table
+INSERT_QUERY = f"""
+    INSERT INTO {{table}} (
+        {', '.join(FACT_COLUMNS)}
+    )
+    VALUES ({', '.join(['%s'] * len(FACT_COLUMNS))})
+    ON DUPLICATE KEY UPDATE Order_ID = Order_ID
+"""
+
+LOAD_DATA_QUERY = f"""
+    LOAD DATA LOCAL INFILE %s
+    IGNORE INTO TABLE {{table}}
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+    LINES TERMINATED BY '\\n'
+    ({', '.join(FACT_COLUMNS)})
+"""
+
+# Staged rows left after deduplication are new orders
+MOVE_STAGE_QUERY = f"""
+    INSERT INTO walmart_dw.FactSales ({', '.join(FACT_COLUMNS)})
+    SELECT {', '.join(FACT_COLUMNS)} FROM {STAGE_TABLE}
+"""
+
+class FactLoader:
+    def __init__(self, conn, batch_size: int = 500, max_latency: float = 0.5,
+                 method: str = "executemany", retries: int = 2, on_commit=None, group_commit=None,
+                 write_timer=None, commit_timer=None, aggregates: bool = False):
+        if method not in ("executemany", "load_data"):
+            raise ValueError(f"Unknown load method: {method}")
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.method = method
+        self.retries = retries
+        self.on_commit = on_commit
+        self.group_commit = group_commit
+        self.write_timer = write_timer
+        self.commit_timer = commit_timer
+        self.aggregates = aggregates
+        self.stage_ready = False  # staging table created in this session
+
+        self.rows = []
+        self.tokens = []
+        self.first_added = None  # time the oldest pending row was added
+
+        # Statistics
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.loaded = 0  # rows added to FactSales
+
+    def add(self, row: tuple, token=None) -> None:
+        """Queue one FactSales row; flushes when the batch is full"""
+        if not self.rows:
+            self.first_added = time.monotonic()
+        self.rows.append(row)
+        self.tokens.append(token)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows: list, tokens: list) -> None:
+        """Queue a block of FactSales rows at once; flushes when the batch is full"""
+        if not rows:
+            return
+        if not self.rows:
+            self.first_added = time.monotonic()
+        self.rows.extend(rows)
+        self.tokens.extend(tokens)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def poll(self) -> None:
+        """Flush the pending batch if its oldest row has waited max_latency"""
+        if self.rows and time.monotonic() - self.first_added >= self.max_latency:
+            self.flush()
+
+    def pending(self) -> int:
+        return len(self.rows)
+
+    def set_batching(self, batch_size: int, max_latency: float) -> None:
+        """Change the flush thresholds (used to trade throughput for freshness)"""
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+
+    def flush(self) -> None:
+        """Write the pending batch, retrying and bisecting on failure"""
+        if not self.rows:
+            return
+        rows, tokens = self.rows, self.tokens
+        self.rows, self.tokens, self.first_added = [], [], None
+
+        committed, failed = [], []
+        loaded = self._write_batch(rows, tokens, committed, failed, self.retries)
+        self.batches += 1
+        self.committed += len(committed)
+        self.failed += len(failed)
+        self.loaded += loaded
+        if self.on_commit:
+            self.on_commit(committed, failed, loaded)
+
+    def _write_batch(self, rows: list, tokens: list, committed: list, failed: list, retries: int) -> int:
+        """Write and commit rows (bisecting on failure); returns the number of rows added to FactSales"""
+        for attempt in range(retries + 1):
+            try:
+                started = perf_counter()
+                loaded = self._write(rows)
+                if self.write_timer:
+                    started = self.write_timer.since(started)
+                if self.group_commit is not None:
+                    self.group_commit.wait_turn()
+                self.conn.commit()
+                if self.commit_timer:
+                    self.commit_timer.since(started)
+                committed.extend(tokens)
+                return loaded
+            except Exception as e:
+                self.conn.rollback()
+                error = e
+
+        if len(rows) == 1:
+            print(f"Error loading to DW: {error} (Order_ID {rows[0][0]})")
+            failed.extend(tokens)
+            return 0
+
+        # Bisect: isolate the bad rows, load the rest
+        mid = len(rows) // 2
+        return (self._write_batch(rows[:mid], tokens[:mid], committed, failed, 0) +
+                self._write_batch(rows[mid:], tokens[mid:], committed, failed, 0))
+
+    def _write(self, rows: list) -> int:
+        if not self.aggregates:
+            return self._insert(rows, "walmart_dw.FactSales")
+
+        # Stage the batch, drop replayed orders, add the rest to the aggregates and move it to FactSales
+        if not self.stage_ready:
+            self.cur.execute(CREATE_STAGE_QUERY)
+            self.stage_ready = True
+        self.cur.execute(CLEAR_STAGE_QUERY)
+        self._insert(rows, STAGE_TABLE)
+        self.cur.execute(DEDUPLICATE_STAGE_QUERY)
+        for query in increment_queries():
+            self.cur.execute(query)
+        self.cur.execute(MOVE_STAGE_QUERY)
+        return self.cur.rowcount
+
+    def _insert(self, rows: list, table: str) -> int:
+        """Write rows to table; returns the number of rows inserted (duplicates affect none)"""
+        if self.method == "executemany":
+            self.cur.executemany(INSERT_QUERY.format(table=table), rows)
+            return self.cur.rowcount
+
+        # LOAD DATA LOCAL INFILE needs the connection opened with allow_local_infile=True
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as file:
+                csv.writer(file, lineterminator="\n").writerows(rows)
+            self.cur.execute(LOAD_DATA_QUERY.format(table=table), (path,))
+            return self.cur.rowcount
+        finally:
+            os.remove(path)
+
+    def close(self) -> None:
+        """Flush remaining rows and close the cursor"""
+        self.flush()
+        self.cur.close()
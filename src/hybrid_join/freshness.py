@@ -0,0 +1,121 @@
+"""
+Freshness Tracker: Measures how long transactions take from arriving in the Stream Buffer
+to being committed to FactSales. Every stream tuple carries its arrival time (wall clock,
+so it survives a resume from checkpoint) as its last field.
+
+Freshness of committed tuples is kept in a ring of one-second slots, each a histogram with
+geometric buckets, so p50/p99/max over the rolling window cost O(buckets) to read and
+O(1) per tuple to record, however high the rate.
+
+When the rolling p99 or the age of the oldest unjoined tuple exceeds the SLA, an alert is
+logged to logs/Freshness.log and the response level is raised; it is lowered again once
+p99 is back under half the SLA. The ETL maps the level to smaller DW batches and more
+partition loads per stream refill.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+# Bucket upper bounds: 1 ms to ~1 h, 25% apart
+FRESHNESS_BUCKETS = tuple(0.001 * 1.25 ** i for i in range(68))
+
+class FreshnessTracker:
+    def __init__(self, sla: float = 5.0, window: int = 60, max_level: int = 3):
+        self.sla = sla
+        self.window = window  # seconds
+        self.max_level = max_level
+        self.level = 0  # adaptive response level, 0 = normal
+        self.breaches = 0
+
+        self.slot_seconds = [None] * window  # second each slot currently holds
+        self.slot_counts = [[0] * (len(FRESHNESS_BUCKETS) + 1) for _ in range(window)]
+        self.slot_max = [0.0] * window
+
+    @staticmethod
+    def log_freshness(message: str) -> None:
+        script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        log_dir = os.path.join(script_dir, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, 'Freshness.log')
+        # Writing to log file
+        with open(log_path, "a", encoding="utf-8") as file:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            file.write(f"[{timestamp}] - {message}\n")
+
+    def _slot(self, now: float) -> int:
+        second = int(now)
+        index = second % self.window
+        if self.slot_seconds[index] != second:
+            # Slot last used a full window ago: reset it
+            self.slot_seconds[index] = second
+            self.slot_counts[index] = [0] * (len(FRESHNESS_BUCKETS) + 1)
+            self.slot_max[index] = 0.0
+        return index
+
+    def record(self, committed: list, now: float = None) -> None:
+        """Record the freshness of committed stream tuples (arrival time is the last field)"""
+        if not committed:
+            return
+        now = now or time.time()
+        index = self._slot(now)
+        counts = self.slot_counts[index]
+        worst = self.slot_max[index]
+        for stream_tuple in committed:
+            freshness = now - stream_tuple[-1]
+            counts[bisect_left(FRESHNESS_BUCKETS, freshness)] += 1
+            if freshness > worst:
+                worst = freshness
+        self.slot_max[index] = worst
+
+    def stats(self, now: float = None) -> dict:
+        """count, p50, p99 (bucket upper bounds) and max freshness over the rolling window"""
+        now = now or time.time()
+        oldest_second = int(now) - self.window + 1
+        counts = [0] * (len(FRESHNESS_BUCKETS) + 1)
+        worst = 0.0
+        for index, second in enumerate(self.slot_seconds):
+            if second is None or second < oldest_second:
+                continue
+            for i, count in enumerate(self.slot_counts[index]):
+                counts[i] += count
+            worst = max(worst, self.slot_max[index])
+
+        total = sum(counts)
+        return {
+            "count": total,
+            "p50": self._quantile(counts, total, 0.5, worst),
+            "p99": self._quantile(counts, total, 0.99, worst),
+            "max": round(worst, 4),
+        }
+
+    @staticmethod
+    def _quantile(counts: list, total: int, q: float, worst: float) -> float | None:
+        if not total:
+            return None
+        running = 0
+        for bound, count in zip(FRESHNESS_BUCKETS, counts):
+            running += count
+            if running >= q * total:
+                return round(min(bound, worst), 4)
+        return round(worst, 4)
+
+    def check(self, oldest_age: float = 0.0, now: float = None) -> bool:
+        """Evaluate the SLA, alert on breach and adjust the response level; returns True on breach"""
+        stats = self.stats(now)
+        p99 = stats["p99"] or 0.0
+        breach = p99 > self.sla or oldest_age > self.sla
+        if breach:
+            self.breaches += 1
+            message = (f"Freshness SLA ({self.sla}s) breached: p99 {p99}s, max {stats['max']}s, "
+                       f"oldest unjoined {oldest_age:.3f}s, response level {self.level}")
+            if self.level < self.max_level:
+                self.level += 1
+                message += f" -> {self.level}"
+                print(f"WARNING: {message}")
+            self.log_freshness(message)
+        elif self.level and p99 < self.sla / 2 and oldest_age < self.sla / 2:
+            self.level -= 1
+            self.log_freshness(f"Freshness back within SLA: p99 {p99}s, response level -> {self.level}")
+        return breach
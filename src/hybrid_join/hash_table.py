@@ -1,16 +1,27 @@
 """
 Hash Table (H): A multi-map (allows multiple entries per key) that stores stream tuples.
-Each entry also includes a pointer (address) to a corresponding node in the queue. 
-The hash table has a fixed number of slots hS = 10,000.
+Each entry also includes a pointer (address) to a corresponding node in the queue.
+The hash table holds at most hS = 10,000 stream tuples by default.
+
+The table is a dict keyed directly by join key. All stream tuples of one key share a
+single entry [node, values] and a single queue node, whose count is the number of tuples
+pending for that key. Removing a key unlinks its node from the queue in O(1).
+
+Joined tuples can be detached while their DW write is in flight: they leave the table and
+the queue but keep their slots until released, i.e. until their batch has committed.
+Tuples joined without entering the table (hot keys, vectorized batches) are held the same
+way, so every tuple awaiting its DW commit is accounted for (and checkpointed).
 """
 
 from datetime import datetime
 
 class HashTable:
-    def __init__(self, hS=10000):
-        self.hS = 10000
-        self.slots_available = hS
-        self.table = [[] for _ in range(hS)]  # list of lists for chaining
+    def __init__(self, hS=10000, queue=None):
+        self.hS = hS  # capacity in stream tuples
+        self.table = {}  # key -> [queue node, list of stream tuples]
+        self.entries = 0
+        self.in_flight = {}  # id -> detached stream tuple awaiting release
+        self.queue = queue  # Queue of pending keys, shared with the join
 
     @staticmethod
     def log_hashed(message: str) -> None:
@@ -24,53 +35,98 @@ class HashTable:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             file.write(f"[{timestamp}] - {message}\n")
 
-    def _hash(self, key):
-        """Compute hash index for a key"""
-        return hash(key) % self.hS
-
     def insert(self, key: int, value: tuple) -> None:
         """Inserts new entry (multi-map - allows multiple values per key)"""
 
-        index = self._hash(key)
-        # Append new key-value pair (multi-map behavior)
-        self.table[index].append([key, value])
-        self.slots_available -= 1
+        entry = self.table.get(key)
+        if entry is None:
+            # First pending tuple for this key: enqueue the key once
+            node = self.queue.enqueue(key) if self.queue is not None else None
+            entry = self.table[key] = [node, []]
+
+        entry[1].append(value)
+        if entry[0] is not None:
+            entry[0].count += 1
+        self.entries += 1
         #log_message: str = f"Inserted key {key} with value {value}"
         #self.log_hashed(log_message)
 
     def get_available_slots(self) -> int:
         """Returns number of available slots"""
-        return max(0, self.slots_available)
-    
+        return max(0, self.hS - self.entries)
+
     def get_total_entries(self) -> int:
         """Returns total number of entries in hash table"""
-        total = 0
-        for bucket in self.table:
-            total += len(bucket)
-        return total
+        return self.entries
 
     def get(self, key):
         """Get all values for a key (multi-map support)"""
-        index = self._hash(key)
-        results = []
-        for pair in self.table[index]:
-            if pair[0] == key:
-                results.append(pair[1])
-        return results if results else None  # Return list of all matches
+        entry = self.table.get(key)
+        return list(entry[1]) if entry else None  # Return list of all matches
 
-    def delete(self, key: int, value: tuple) -> bool:
-        index = self._hash(key)
-        bucket = self.table[index]
+    def pop(self, key) -> list:
+        """Remove a key with all its values and its queue node, returning the values"""
+        entry = self.table.pop(key, None)
+        if entry is None:
+            return []
+        if entry[0] is not None:
+            self.queue.remove(entry[0])
+        self.entries -= len(entry[1])
+        return entry[1]
 
-        for i, pair in enumerate(bucket):
-            k, v = pair
+    def detach(self, key) -> list:
+        """Remove a key from the table and the queue, keeping its tuples' slots until released"""
+        entry = self.table.pop(key, None)
+        if entry is None:
+            return []
+        if entry[0] is not None:
+            self.queue.remove(entry[0])
+        for value in entry[1]:
+            self.in_flight[id(value)] = value
+        return entry[1]
+
+    def hold_many(self, values: list) -> None:
+        """Take slots for a block of tuples joined outside the table"""
+        self.in_flight.update(zip(map(id, values), values))
+        self.entries += len(values)
+
+    def release(self, values: list) -> None:
+        """Free the slots of detached tuples"""
+        for value in values:
+            if self.in_flight.pop(id(value), None) is not None:
+                self.entries -= 1
+
+    def oldest(self) -> tuple | None:
+        """The oldest pending stream tuple (first tuple of the key at the head of the queue)"""
+        key = self.queue.peek() if self.queue is not None else None
+        entry = self.table.get(key) if key is not None else None
+        return entry[1][0] if entry else None
+
+    def snapshot(self) -> list:
+        """All tuples held by the table, pending and in flight"""
+        tuples = [value for entry in self.table.values() for value in entry[1]]
+        tuples.extend(self.in_flight.values())
+        return tuples
+
+    def delete(self, key: int, value: tuple) -> bool:
+        entry = self.table.get(key)
+        if entry is None:
+            return False
 
-            if k == key and v == value:
-                bucket.pop(i)
-                self.slots_available += 1
-                return True
+        try:
+            entry[1].remove(value)
+        except ValueError:
+            return False
 
-        return False
+        self.entries -= 1
+        if not entry[1]:
+            # Last tuple of the key: drop the entry and its queue node
+            del self.table[key]
+            if entry[0] is not None:
+                self.queue.remove(entry[0])
+        elif entry[0] is not None:
+            entry[0].count -= 1
+        return True
 
 if __name__=="__main__":
     ...
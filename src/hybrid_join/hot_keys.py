@@ -0,0 +1,105 @@
+"""
+Hot Key Cache: A CACHEJOIN-style stage in front of the hash table for skewed streams. The
+master rows of the most frequent Customer_IDs stay resident; stream tuples of those
+customers are joined as soon as they are popped from the stream buffer and never enter
+the hash table, the queue or a partition load.
+
+Frequency detection happens during the probe: a customer record that matches at least
+threshold stream tuples in one partition load is admitted. When the cache is full the
+resident key with the lowest frequency is evicted if the newcomer is more frequent.
+Frequencies count hits and are halved every decay_every lookups, so the hot set follows
+the stream online. Coverage is the share of stream tuples served by the cache.
+
+Lookups are made per popped batch (split): one dict lookup per tuple, with hits, misses
+and frequencies counted once per batch.
+"""
+
+from collections import Counter
+from operator import itemgetter
+
+class HotKeyCache:
+    def __init__(self, capacity: int = 1000, threshold: int = 8, decay_every: int = 100000):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.decay_every = decay_every
+        self.rows = {}  # Customer_ID -> master record
+        self.freq = {}  # Customer_ID -> decayed frequency
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.admissions = 0
+        self.evictions = 0
+        self.lookups_since_decay = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def split(self, rows: list, key_index: int = 1) -> tuple:
+        """Split popped stream tuples into (hot tuples, their master records, other tuples)"""
+        self.lookups_since_decay += len(rows)
+        if self.lookups_since_decay >= self.decay_every:
+            self.decay()
+        resident = self.rows
+        if not resident:
+            self.misses += len(rows)
+            return [], [], rows
+
+        hot_rows, records, cold_rows = [], [], []
+        for row in rows:
+            record = resident.get(row[key_index])
+            if record is None:
+                cold_rows.append(row)
+            else:
+                hot_rows.append(row)
+                records.append(record)
+
+        if hot_rows:
+            self.hits += len(hot_rows)
+            freq = self.freq
+            for key, count in Counter(map(itemgetter(key_index), hot_rows)).items():
+                freq[key] += count
+        self.misses += len(cold_rows)
+        return hot_rows, records, cold_rows
+
+    def observe(self, key, record: dict, matches: int) -> bool:
+        """Report the matches of a master record in one partition load; returns True if admitted"""
+        if matches < self.threshold or key in self.rows or not self.capacity:
+            return False
+        if len(self.rows) >= self.capacity:
+            coldest = min(self.freq, key=self.freq.get)
+            if self.freq[coldest] >= matches:
+                return False
+            del self.rows[coldest]
+            del self.freq[coldest]
+            self.evictions += 1
+        self.rows[key] = record
+        self.freq[key] = matches
+        self.admissions += 1
+        return True
+
+    def decay(self) -> None:
+        """Halve all frequencies so that keys which cooled down can be replaced"""
+        self.lookups_since_decay = 0
+        for key in self.freq:
+            self.freq[key] //= 2
+
+    def clear(self) -> None:
+        """Drop every resident row (master data has changed)"""
+        self.rows.clear()
+        self.freq.clear()
+
+    def coverage(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.rows),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coverage": round(self.coverage(), 4),
+            "admissions": self.admissions,
+            "evictions": self.evictions,
+        }
@@ -2,11 +2,14 @@
 Queue: A doubly-linked list that stores the join attribute values (keys) from the stream tuples in FIFO order. 
 Each node also has pointers to its neighbors. The queue tracks the order of arrival for fairness in processing.
 
+A key is queued once while it has pending tuples; the node's count is the number of
+stream tuples waiting for that key in the hash table.
 """
 
 class Node:
     def __init__(self, key: int):
         self.key = key
+        self.count = 0
         self.prev = None
         self.next = None
 
@@ -15,7 +18,7 @@ class Queue:
         self.head = None
         self.tail = None
 
-    def enqueue(self, key: int) -> None:
+    def enqueue(self, key: int) -> Node:
         node = Node(key)
 
         if self.tail is None:
@@ -25,6 +28,8 @@ class Queue:
             node.prev = self.tail 
             self.tail = node
 
+        return node
+
     def dequeue(self) -> int | None:
         if self.head is None:
             return None
@@ -39,5 +44,25 @@ class Queue:
             
         return key
 
+    def peek(self) -> int | None:
+        """Returns the oldest key without removing it"""
+        return self.head.key if self.head else None
+
+    def remove(self, node: Node) -> None:
+        """Unlinks a node from anywhere in the queue in O(1)"""
+        if node.prev:
+            node.prev.next = node.next
+        elif self.head is node:
+            self.head = node.next
+        else:
+            return  # node is not linked
+
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+
+        node.prev = node.next = None
+
     def is_empty(self) -> bool:
         return self.head is None
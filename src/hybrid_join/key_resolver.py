@@ -0,0 +1,90 @@
+"""
+Surrogate Key Resolver: Compact precomputed maps for the surrogate keys FactSales needs,
+date string -> Date_ID and Product_ID -> (Store_ID, price). The maps are warmed at startup
+from DimDate and the product master; a miss is resolved with the standard library (no
+pandas call per row) and cached. Hit and miss counts are kept per map.
+"""
+
+from datetime import datetime
+import pandas as pd
+
+# Date formats tried, in order, when a date string is not in the warmed map
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S")
+
+def parse_date_id(date_str: str) -> int | None:
+    """Convert a date string to Date_ID format (YYYYMMDD) without pandas"""
+    date_str = str(date_str).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            date_obj = datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+        return date_obj.year * 10000 + date_obj.month * 100 + date_obj.day
+    return None
+
+class SurrogateKeyResolver:
+    def __init__(self):
+        self.date_ids = {}  # date string -> Date_ID (None for unparseable strings)
+        self.products = {}  # Product_ID -> (Store_ID, price)
+
+        # Statistics
+        self.date_hits = 0
+        self.date_misses = 0
+        self.product_hits = 0
+        self.product_misses = 0
+
+    def warm_dates(self, cur) -> int:
+        """Load every Date_ID from DimDate, keyed by its ISO date string"""
+        cur.execute("SELECT Date_ID, Full_Date FROM walmart_dw.DimDate")
+        for date_id, full_date in cur.fetchall():
+            self.date_ids[str(full_date)] = int(date_id)
+        return len(self.date_ids)
+
+    def warm_products(self, product_master_csv: str) -> int:
+        """Load Store_ID and price of every product from the product master"""
+        df = pd.read_csv(product_master_csv, usecols=['Product_ID', 'storeID', 'price$'],
+                         dtype={'Product_ID': 'str'})
+        self.products = dict(zip(
+            df['Product_ID'].tolist(),
+            zip(df['storeID'].astype('int64').tolist(), df['price$'].astype('float64').tolist())
+        ))
+        return len(self.products)
+
+    def date_id(self, date_str: str) -> int | None:
+        """Date_ID of a date string"""
+        try:
+            date_id = self.date_ids[date_str]
+            self.date_hits += 1
+            return date_id
+        except KeyError:
+            self.date_misses += 1
+            date_id = self.date_ids[date_str] = parse_date_id(date_str)
+            return date_id
+
+    def product(self, product_id: str) -> tuple | None:
+        """(Store_ID, price) of a product"""
+        info = self.products.get(product_id)
+        if info is None:
+            self.product_misses += 1
+        else:
+            self.product_hits += 1
+        return info
+
+    def store_id(self, product_id: str) -> int | None:
+        info = self.product(product_id)
+        return info[0] if info else None
+
+    def price(self, product_id: str) -> float | None:
+        info = self.product(product_id)
+        return info[1] if info else None
+
+    def stats(self) -> dict:
+        """Map sizes and hit rates"""
+        date_lookups = self.date_hits + self.date_misses
+        product_lookups = self.product_hits + self.product_misses
+        return {
+            "dates": len(self.date_ids),
+            "date_hit_rate": round(self.date_hits / date_lookups, 4) if date_lookups else 0.0,
+            "products": len(self.products),
+            "product_hit_rate": round(self.product_hits / product_lookups, 4) if product_lookups else 0.0,
+        }
@@ -16,7 +16,20 @@ from datetime import datetime
 from stream_buffer import StreamBuffer
 from hash_table import HashTable
 from disk_buffer import DiskBuffer
-from queue import Queue
+from page_store import ensure_page_store, EXTENSION
+from partition_cache import PartitionCache
+from fact_loader import FactLoader
+from writer_pool import WriterPool
+from key_resolver import SurrogateKeyResolver
+from key_queue import Queue
+from checkpoint import Checkpointer
+from arrivals import ConstantRate, Pacer, PROFILES, make_profile
+from metrics import Metrics, Histogram
+from freshness import FreshnessTracker
+from adaptive import AdaptiveController
+from hot_keys import HotKeyCache
+from product_join import ProductJoin
+from vectorized import vectorized_worker
 import threading
 import time
 
@@ -25,153 +38,548 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class HybridJoinETL:
     def __init__(self, db_user: str, db_password: str, 
-                 transaction_csv: str, customer_master_csv: str, product_master_csv: str):
+                 transaction_csv: str, customer_master_csv: str, product_master_csv: str,
+                 customer_master_pages: str = None, product_master_pages: str = None,
+                 cache_partitions: int = 32, cache_policy: str = "lru",
+                 batch_size: int = 500, max_latency: float = 0.5, load_method: str = "executemany",
+                 buffer_capacity: int = None, buffer_policy: str = "block", writers: int = 0,
+                 refresh_marker: str = None, checkpoint_path: str = None, checkpoint_interval: float = 10.0,
+                 sink=None, freshness_sla: float = 5.0, freshness_window: int = 60,
+                 hash_capacity: int = 10000, partition_size: int = 500, adaptive: bool = False,
+                 memory_limit_mb: float = None, hot_keys: int = 0, product_stage: bool = True,
+                 aggregates: bool = False):
         self.db_user = db_user
         self.db_password = db_password
         self.transaction_csv = transaction_csv
         self.customer_master_csv = customer_master_csv
         self.product_master_csv = product_master_csv
+        self.customer_master_pages = customer_master_pages
+        self.product_master_pages = product_master_pages
         
         # Initialize data structures
-        self.stream_buffer = StreamBuffer()
-        self.hash_table = HashTable()
+        self.stream_buffer = StreamBuffer(capacity=buffer_capacity, policy=buffer_policy)
         self.queue = Queue()
-        self.customer_disk_buffer = DiskBuffer(customer_master_csv, partition_size=500, key_column="Customer_ID")
-        self.product_disk_buffer = DiskBuffer(product_master_csv, partition_size=500, key_column="Product_ID")
+        self.hash_table = HashTable(hS=hash_capacity, queue=self.queue)
+        self.partition_size = partition_size  # customer partition size (adjusted by the adaptive controller)
+        # Disk buffers read R from page stores when available, else from the CSVs
+        self.customer_cache = PartitionCache(cache_partitions, cache_policy)
+        self.product_cache = PartitionCache(cache_partitions, cache_policy)
+        self.customer_disk_buffer = DiskBuffer(customer_master_pages or customer_master_csv,
+                                               partition_size=partition_size, key_column="Customer_ID",
+                                               cache=self.customer_cache)
+        self.partition_size = self.customer_disk_buffer.set_partition_size(partition_size)
+        self.product_disk_buffer = DiskBuffer(product_master_pages or product_master_csv,
+                                              partition_size=500, key_column="Product_ID",
+                                              cache=self.product_cache)
         
-        # Database connection (will be established in worker thread)
+        # Resident master rows of the hottest customers (0 = disabled)
+        self.hot_keys = HotKeyCache(hot_keys) if hot_keys else None
+        
+        # Pipelined product enrichment in its own thread (None = enrich in the join thread)
+        self.product_join = ProductJoin(hS=hash_capacity) if product_stage else None
+        
+        # Database connection and batching loader (will be established in worker thread)
         self.conn = None
         self.cur = None
+        self.loader = None
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.load_method = load_method
+        self.writers = writers  # 0 = load from the join thread, N = pool of N writer threads
+        self.sink = sink  # stand-in loader used instead of MySQL (benchmarks)
+        self.aggregates = aggregates  # maintain the summary tables with every FactSales batch
+        
+        # Surrogate keys: Product_ID -> (Store_ID, price) now, Date_ID once connected
+        self.key_resolver = SurrogateKeyResolver()
+        self.key_resolver.warm_products(product_master_csv)
+        
+        # Incremental dimension refresh (dw_config.py --refresh) touches this marker
+        self.refresh_marker = refresh_marker
+        self.refresh_seen = self._marker_mtime()
+        self.refresh_checked = time.monotonic()
         
-        # Load product master data into memory for quick lookup
-        self.product_df = pd.read_csv(product_master_csv)
-        self.product_lookup = {}
-        for _, row in self.product_df.iterrows():
-            self.product_lookup[str(row['Product_ID'])] = {
-                'storeID': int(row['storeID']),
-                'price': float(row['price$'])
-            }
+        # Checkpointing (resume after a crash instead of replaying the stream)
+        self.checkpointer = Checkpointer(checkpoint_path, checkpoint_interval) if checkpoint_path else None
+        self.last_order_id = None  # Order_ID of the most recently committed row
         
-        # Statistics
-        self.processed_count = 0
-        self.loaded_count = 0
-        self.lock = threading.Lock()
+        # Freshness (arrival in the stream buffer -> DW commit) against an SLA in seconds
+        self.freshness = FreshnessTracker(freshness_sla, freshness_window)
+        self.freshness_checked = time.monotonic()
+        self.probes_per_refill = 1  # partition loads per stream-buffer refill, raised on SLA breach
+        
+        # Metrics: per-thread counters and stage latency histograms (no lock on the hot path)
+        self.metrics = Metrics()
+        self.processed = self.metrics.counter("tuples_processed_total", "Stream tuples loaded into the hash table")
+        self.loaded = self.metrics.counter("tuples_loaded_total", "FactSales rows committed")
+        self.failed = self.metrics.counter("tuples_failed_total", "FactSales rows that could not be loaded")
+        self.unmatched = self.metrics.counter("tuples_unmatched_total",
+                                              "Stream tuples dropped because their customer, product or date has no match")
+        # Lines for logs/Unmatched.log, written in batches rather than one append per dropped tuple
+        self.unmatched_lines = []
+        self.unmatched_lock = threading.Lock()
+        self.unmatched_flushed = time.monotonic()
+        self.partition_loads = self.metrics.counter("partition_loads_total", "Customer partitions loaded by the join")
+        self.matched = self.metrics.counter("tuples_matched_total", "Stream tuples matched by partition probes")
+        self.feed_seconds = self.metrics.histogram("feed_seconds", "Time to push one batch into the stream buffer")
+        self.buffer_wait_seconds = self.metrics.histogram("buffer_wait_seconds", "Time the join waits on the stream buffer")
+        self.hash_insert_seconds = self.metrics.histogram("hash_insert_seconds", "Time to insert one batch into the hash table")
+        self.partition_load_seconds = self.metrics.histogram("partition_load_seconds", "Time to load one customer partition")
+        self.probe_seconds = self.metrics.histogram("probe_seconds", "Time to probe one customer partition")
+        self.product_partition_loads = self.metrics.counter("product_partition_loads_total",
+                                                            "Product partitions loaded by the product stage")
+        self.product_join_seconds = self.metrics.histogram("product_join_seconds",
+                                                           "Time to enrich one batch of joined tuples with product data")
+        self.batch_join_seconds = self.metrics.histogram("batch_join_seconds",
+                                                         "Time to join one micro-batch (vectorized engine)")
+        self.db_write_seconds = self.metrics.histogram("db_write_seconds", "Time to write one FactSales batch")
+        self.commit_seconds = self.metrics.histogram("commit_seconds", "Time to commit one FactSales batch")
+        self.metrics.gauge("stream_buffer_depth", "Tuples waiting in the stream buffer", self.stream_buffer.size)
+        self.metrics.gauge("hash_table_entries", "Stream tuples held by the hash table", self.hash_table.get_total_entries)
+        self.metrics.gauge("customer_cache_hit_rate", "Customer partition cache hit rate", self.customer_cache.hit_rate)
+        self.metrics.gauge("product_cache_hit_rate", "Product partition cache hit rate", self.product_cache.hit_rate)
+        if self.hot_keys is not None:
+            self.metrics.gauge("hot_key_coverage", "Share of stream tuples joined from the hot-key cache",
+                               self.hot_keys.coverage)
+            self.metrics.gauge("hot_keys_resident", "Customer rows resident in the hot-key cache",
+                               lambda: len(self.hot_keys))
+            # Arrival-to-join time of cached and of probed tuples, to compare their tails
+            self.hot_join_wait_seconds = self.metrics.histogram(
+                "hot_join_wait_seconds", "Arrival-to-join time of tuples joined from the hot-key cache")
+            self.join_wait_seconds = self.metrics.histogram(
+                "join_wait_seconds", "Arrival-to-join time of tuples joined by partition probes")
+        if self.product_join is not None:
+            self.metrics.gauge("product_stage_depth", "Tuples waiting in the product stage", self.product_join.pending)
+        self.metrics.gauge("hash_table_capacity", "Hash-table budget hS", lambda: self.hash_table.hS)
+        self.metrics.gauge("customer_partition_size", "Customer partition size", lambda: self.partition_size)
+        self.metrics.gauge("freshness_p50_seconds", "Rolling p50 of arrival-to-commit time",
+                           lambda: self.freshness.stats()["p50"] or 0)
+        self.metrics.gauge("freshness_p99_seconds", "Rolling p99 of arrival-to-commit time",
+                           lambda: self.freshness.stats()["p99"] or 0)
+        self.metrics.gauge("freshness_max_seconds", "Rolling max of arrival-to-commit time",
+                           lambda: self.freshness.stats()["max"])
+        self.metrics.gauge("oldest_unjoined_age_seconds", "Age of the oldest tuple waiting in the hash table",
+                           self.oldest_unjoined_age)
+        self.metrics.gauge("freshness_sla_breaches", "Freshness checks that breached the SLA",
+                           lambda: self.freshness.breaches)
+        
+        # Adaptive sizing of hS and the customer partition size
+        self.controller = AdaptiveController(self, memory_limit_mb=memory_limit_mb) if adaptive else None
+        
+    @property
+    def processed_count(self) -> int:
+        return self.processed.value()
+    
+    @property
+    def loaded_count(self) -> int:
+        return self.loaded.value()
+    
+    @property
+    def unmatched_count(self) -> int:
+        return self.unmatched.value()
+    
+    @staticmethod
+    def log_unmatched(lines: list) -> None:
+        """Record dropped stream tuples, one line each, in logs/Unmatched.log"""
+        script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        log_dir = os.path.join(script_dir, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, 'Unmatched.log')
+        # Writing to log file
+        with open(log_path, "a", encoding="utf-8") as file:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            file.writelines(f"[{timestamp}] - {line}\n" for line in lines)
+    
+    def expire(self, unmatched: list) -> None:
+        """Count (stream tuple, reason) pairs of tuples that are dropped unjoined and queue their log lines"""
+        self.unmatched.inc(len(unmatched))
+        lines = [f"Order_ID {stream_tuple[0]}: {reason}" for stream_tuple, reason in unmatched]
+        with self.unmatched_lock:
+            self.unmatched_lines.extend(lines)
+    
+    def flush_unmatched(self, interval: float = 1.0) -> None:
+        """Write the queued unmatched lines if interval seconds have passed (0: now)"""
+        now = time.monotonic()
+        if not self.unmatched_lines or now - self.unmatched_flushed < interval:
+            return
+        with self.unmatched_lock:
+            lines, self.unmatched_lines = self.unmatched_lines, []
+        self.unmatched_flushed = now
+        self.log_unmatched(lines)
+    
+    def stage_latencies(self) -> dict:
+        """p50/p99 upper bounds (seconds) of every stage histogram"""
+        return {
+            name.removeprefix("hybridjoin_").removesuffix("_seconds"): (metric.quantile(0.5), metric.quantile(0.99))
+            for name, metric in self.metrics.metrics.items() if isinstance(metric, Histogram)
+        }
         
     def establish_db_connection(self):
         """Establish database connection"""
+        # With a product stage the loader runs in the product thread and acknowledgements
+        # are applied by the join thread (poll_commits)
+        on_commit = self.product_join.on_commit if self.product_join is not None else self.on_commit
+        if self.sink is not None:
+            self.sink.on_commit = on_commit
+            self.loader = self.sink
+            print("Using stand-in sink instead of the DW")
+            return
         try:
-            self.conn = mysql.connector.connect(
+            db_config = dict(
                 host="localhost",
                 user=self.db_user,
                 password=self.db_password,
-                database="walmart_dw"
+                database="walmart_dw",
+                allow_local_infile=(self.load_method == "load_data")
             )
+            self.conn = mysql.connector.connect(**db_config)
             self.cur = self.conn.cursor()
+            self.key_resolver.warm_dates(self.cur)
+            if self.writers:
+                self.loader = WriterPool(db_config, n_writers=self.writers, batch_size=self.batch_size,
+                                         max_latency=self.max_latency, method=self.load_method,
+                                         on_commit=on_commit, write_timer=self.db_write_seconds,
+                                         commit_timer=self.commit_seconds, aggregates=self.aggregates)
+            else:
+                self.loader = FactLoader(self.conn, batch_size=self.batch_size, max_latency=self.max_latency,
+                                         method=self.load_method, on_commit=on_commit,
+                                         write_timer=self.db_write_seconds, commit_timer=self.commit_seconds,
+                                         aggregates=self.aggregates)
             print("Database connection established")
         except Exception as e:
             print(f"Failed to connect to database: {e}")
             raise
     
+    def _marker_mtime(self) -> float:
+        if self.refresh_marker and os.path.exists(self.refresh_marker):
+            return os.path.getmtime(self.refresh_marker)
+        return 0.0
+    
+    def refresh_due(self, interval: float = 1.0) -> bool:
+        """True once the master data has been refreshed since the last reload (checked every interval s)"""
+        now = time.monotonic()
+        if not self.refresh_marker or now - self.refresh_checked < interval:
+            return False
+        self.refresh_checked = now
+        mtime = self._marker_mtime()
+        if mtime <= self.refresh_seen:
+            return False
+        self.refresh_seen = mtime
+        return True
+    
+    def reload_masters(self) -> None:
+        """Swap in disk buffers and product keys built from the refreshed master data"""
+        if self.customer_master_pages:
+            ensure_page_store(self.customer_master_csv, self.customer_master_pages, "Customer_ID")
+        
+        old_buffer = self.customer_disk_buffer
+        self.customer_disk_buffer = DiskBuffer(self.customer_master_pages or self.customer_master_csv,
+                                               partition_size=self.partition_size, key_column="Customer_ID",
+                                               cache=self.customer_cache)
+        self.customer_disk_buffer.set_partition_size(self.partition_size)
+        old_buffer.close()
+        if self.hot_keys is not None:
+            self.hot_keys.clear()
+        if self.product_join is not None:
+            # The product thread swaps its own disk buffer between iterations
+            self.product_join.reload_due.set()
+        else:
+            self.reload_products()
+        print("Master data reloaded after dimension refresh")
+    
+    def reload_products(self) -> None:
+        """Swap in the product disk buffer and product keys built from the refreshed master data"""
+        if self.product_master_pages:
+            ensure_page_store(self.product_master_csv, self.product_master_pages, "Product_ID")
+        
+        old_buffer = self.product_disk_buffer
+        self.product_disk_buffer = DiskBuffer(self.product_master_pages or self.product_master_csv,
+                                              partition_size=500, key_column="Product_ID",
+                                              cache=self.product_cache)
+        old_buffer.close()
+        self.key_resolver.warm_products(self.product_master_csv)
+    
+    def oldest_unjoined_age(self) -> float:
+        """Seconds since the oldest tuple still waiting in the hash table arrived"""
+        oldest = self.hash_table.oldest()
+        return time.time() - oldest[-1] if oldest else 0.0
+    
+    def check_freshness(self, interval: float = 1.0) -> None:
+        """Check the freshness SLA every interval seconds and apply the response level"""
+        now = time.monotonic()
+        if now - self.freshness_checked < interval:
+            return
+        self.freshness_checked = now
+        level = self.freshness.level
+        self.freshness.check(self.oldest_unjoined_age())
+        if self.freshness.level != level:
+            # Smaller, more frequent DW batches and more partition loads per refill
+            level = self.freshness.level
+            self.loader.set_batching(max(50, self.batch_size >> level), max(0.01, self.max_latency / 2 ** level))
+            self.probes_per_refill = 2 ** level
+    
+    def restore_checkpoint(self) -> int:
+        """Reload the pending tuples of the last checkpoint; returns the stream offset to resume from"""
+        state = self.checkpointer.load() if self.checkpointer else None
+        if state is None:
+            return 0
+        self.stream_buffer.restore(state["pending"], state["stream_offset"])
+        self.last_order_id = state["last_order_id"]
+        print(f"Resuming from checkpoint: offset {state['stream_offset']}, "
+              f"{len(state['pending'])} pending tuples, last Order_ID {self.last_order_id}")
+        return state["stream_offset"]
+    
     def get_date_id(self, date_str: str) -> int:
         """Convert date string to Date_ID format (YYYYMMDD)"""
-        try:
-            date_obj = pd.to_datetime(date_str)
-            return int(date_obj.strftime('%Y%m%d'))
-        except:
-            return None
+        return self.key_resolver.date_id(date_str)
     
     def get_store_id(self, product_id: str) -> int:
         """Get Store_ID from product lookup"""
-        if product_id in self.product_lookup:
-            return self.product_lookup[product_id]['storeID']
-        return None
+        return self.key_resolver.store_id(product_id)
     
-    def load_to_dw(self, enriched_tuple: dict):
-        """Load enriched transaction into FactSales table"""
-        try:
-            # Get Date_ID
-            date_id = self.get_date_id(enriched_tuple['date'])
-            if date_id is None:
-                return False
-            
-            # Get Store_ID
-            store_id = self.get_store_id(enriched_tuple['Product_ID'])
-            if store_id is None:
-                return False
-            
-            # Calculate purchase amount
-            purchase_amount = enriched_tuple.get('purchase_amount', 0)
-            
-            query = """
-                INSERT INTO walmart_dw.FactSales (
-                    Order_ID,
-                    Customer_ID,
-                    Product_ID,
-                    Date_ID,
-                    Store_ID,
-                    Purchase_Amount,
-                    Quantity
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            values = (
-                enriched_tuple['orderID'],
-                enriched_tuple['Customer_ID'],
-                enriched_tuple['Product_ID'],
-                date_id,
-                store_id,
-                purchase_amount,
-                enriched_tuple['quantity']
-            )
-            
-            self.cur.execute(query, values)
-            self.conn.commit()
-            
-            with self.lock:
-                self.loaded_count += 1
-                if self.loaded_count % 100 == 0:
-                    print(f"Loaded {self.loaded_count} records into DW...")
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error loading to DW: {e}")
-            self.conn.rollback()
-            return False
+    def poll_commits(self) -> None:
+        """Flush the DW batch if it has waited long enough, or apply the product stage's acknowledgements"""
+        if self.product_join is not None:
+            self.product_join.poll(self.on_commit, self.hash_table.release)
+        else:
+            self.loader.poll()
+        self.flush_unmatched()
+    
+    def wait_commits(self) -> None:
+        """Wait for the pending DW batch to commit"""
+        if self.product_join is not None:
+            self.product_join.wait(self.max_latency, self.on_commit, self.hash_table.release)
+        else:
+            self.loader.flush()
+    
+    def discard(self, stream_tuple: tuple, reason: str) -> None:
+        """Free the slot of a joined tuple that cannot be loaded"""
+        self.expire([(stream_tuple, reason)])
+        if self.product_join is not None:
+            self.product_join.discarded.append(stream_tuple)
+        else:
+            self.hash_table.release([stream_tuple])
+    
+    def on_commit(self, committed: list, failed: list, loaded: int = None) -> None:
+        """
+        Release hash-table slots of tuples whose batch has committed or failed.
+        loaded is the number of rows the batch added to FactSales (default: all committed).
+        """
+        self.hash_table.release(committed)
+        self.hash_table.release(failed)
+        self.freshness.record(committed)
+        if committed:
+            self.last_order_id = committed[-1][0]
+        
+        if loaded is None:
+            loaded = len(committed)
+        previous = self.loaded_count
+        self.loaded.inc(loaded)
+        self.failed.inc(len(failed))
+        if (previous + loaded) // 100 > previous // 100:
+            print(f"Loaded {previous + loaded} records into DW...")
+    
+    def load_to_dw(self, enriched_tuple: dict, token=None) -> str | None:
+        """Queue enriched transaction for the next FactSales batch; returns why it cannot be loaded, if so"""
+        # Get Date_ID
+        date_id = self.get_date_id(enriched_tuple['date'])
+        if date_id is None:
+            return f"no Date_ID for {enriched_tuple['date']}"
+        
+        # Get Store_ID
+        store_id = self.get_store_id(enriched_tuple['Product_ID'])
+        if store_id is None:
+            return f"no Store_ID for Product_ID {enriched_tuple['Product_ID']}"
+        
+        # Calculate purchase amount
+        purchase_amount = enriched_tuple.get('purchase_amount', 0)
+        
+        values = (
+            enriched_tuple['orderID'],
+            enriched_tuple['Customer_ID'],
+            enriched_tuple['Product_ID'],
+            date_id,
+            store_id,
+            purchase_amount,
+            enriched_tuple['quantity']
+        )
+        
+        self.loader.add(values, token)
+        return None
 
-def generate_tuple(df: pd.DataFrame, index: int) -> tuple:
-    """Return a tuple for each transactional row"""
-    row = df.iloc[index]
-    orderID = int(row.orderID)
-    Customer_ID = int(row.Customer_ID)
-    Product_ID = str(row.Product_ID)
-    quantity = int(row.quantity)
-    date = str(row.date)
-    trans_tuple = (orderID, Customer_ID, Product_ID, quantity, date)
-    return trans_tuple
+# Fixed dtypes of the transactional stream
+TRANSACTION_DTYPES = {
+    'orderID': 'int64',
+    'Customer_ID': 'int64',
+    'Product_ID': 'str',
+    'quantity': 'int64',
+    'date': 'str'
+}
+
+def generate_tuples(chunk: pd.DataFrame) -> list:
+    """Return a tuple for each transactional row of a chunk (column-wise conversion)"""
+    return list(zip(
+        chunk['orderID'].tolist(),
+        chunk['Customer_ID'].tolist(),
+        chunk['Product_ID'].tolist(),
+        chunk['quantity'].tolist(),
+        chunk['date'].tolist()
+    ))
 
 def extract_key(tup: tuple) -> int:
     """Extracting Key (CustomerID) for Hashing"""
     _, key, *_ = tup
     return key
 
-def stream_feeder(stream_buffer: StreamBuffer, csv_path: str, stop_event: threading.Event) -> None:
+def stream_feeder(stream_buffer: StreamBuffer, csv_path: str, stop_event: threading.Event,
+                  chunk_size: int = 10000, batch_size: int = 100, delay: float = 0.0001,
+                  start_offset: int = 0, arrivals=None, on_push=None, feed_timer=None) -> None:
     """
     Continuously read the CSV and push tuples into stream buffer.
     Simulates a real-time transactional stream.
+    The CSV is read in chunks of chunk_size rows and pushed in batches of batch_size tuples,
+    so feeder memory is bounded by one chunk.
+    When resuming from a checkpoint, the first start_offset rows (already read) are skipped.
+    Arrivals are paced by an arrival profile (see arrivals.py), by default one tuple every
+    delay seconds; on_push(batch) is called after each batch is pushed, and the push time is
+    observed in feed_timer (a metrics Histogram) when given.
     """
-    df = pd.read_csv(csv_path)
+    pacer = Pacer(arrivals or ConstantRate(1.0 / delay))
     idx = 0
+    reader = pd.read_csv(csv_path, usecols=list(TRANSACTION_DTYPES), dtype=TRANSACTION_DTYPES,
+                         chunksize=chunk_size, skiprows=range(1, start_offset + 1))
     
-    while not stop_event.is_set() and idx < len(df):
-        row_tuple: tuple = generate_tuple(df, idx)
-        stream_buffer.push(row_tuple)
-        idx += 1
-        time.sleep(0.0001)  # Simulate streaming delay
+    for chunk in reader:
+        tuples = generate_tuples(chunk)
+        for start in range(0, len(tuples), batch_size):
+            if stop_event.is_set():
+                break
+            batch = tuples[start:start + batch_size]
+            # Simulate streaming delay: wait until the batch is due
+            pacer.wait(batch)
+            pushed = time.perf_counter()
+            stream_buffer.push_many(batch)
+            if feed_timer:
+                feed_timer.since(pushed)
+            if on_push:
+                on_push(batch)
+            idx += len(batch)
+        if stop_event.is_set():
+            break
     
     print(f"Stream feeder finished. Processed {idx} transactions.")
 
+def enrich_tuple(etl: HybridJoinETL, stream_tuple: tuple, customer_record: dict,
+                 product_record: dict | None) -> dict | None:
+    """Join a stream tuple with its customer record and product master data"""
+    orderID, Customer_ID, Product_ID, quantity, date, arrived = stream_tuple
+    
+    if product_record:
+        purchase_amount = float(product_record.get('price$', 0)) * quantity
+    else:
+        # Try to get product price from the resolver
+        price = etl.key_resolver.price(Product_ID)
+        if price is None:
+            return None
+        purchase_amount = price * quantity
+    
+    # Step 8: Create enriched tuple
+    return {
+        'orderID': orderID,
+        'Customer_ID': Customer_ID,
+        'Product_ID': Product_ID,
+        'quantity': quantity,
+        'date': date,
+        'purchase_amount': purchase_amount,
+        'customer_data': customer_record,
+        'product_data': product_record
+    }
+
+def load_tuple(etl: HybridJoinETL, stream_tuple: tuple, customer_record: dict,
+               product_record: dict | None) -> None:
+    """Enrich a stream tuple and queue it for the DW; its slot is released if it cannot be loaded"""
+    enriched_tuple = enrich_tuple(etl, stream_tuple, customer_record, product_record)
+    
+    # Step 9: Queue enriched data for the next DW batch
+    if enriched_tuple is None:
+        etl.discard(stream_tuple, f"no product data for Product_ID {stream_tuple[2]}")
+    elif (reason := etl.load_to_dw(enriched_tuple, stream_tuple)) is not None:
+        etl.discard(stream_tuple, reason)
+
+def join_tuple(etl: HybridJoinETL, product_disk_buffer: DiskBuffer,
+               stream_tuple: tuple, customer_record: dict) -> None:
+    """Enrich a stream tuple with its own product partition load (no product stage)"""
+    Product_ID = stream_tuple[2]
+    
+    # Step 7: Load product master data partition
+    product_partition = product_disk_buffer.load_partition(Product_ID)
+    product_record = None
+    
+    if product_partition:
+        # Find exact match
+        for prod in product_partition:
+            if str(prod.get('Product_ID', '')) == Product_ID:
+                product_record = prod
+                break
+    
+    load_tuple(etl, stream_tuple, customer_record, product_record)
+
+def product_join_worker(etl: HybridJoinETL) -> None:
+    """
+    Runs the product stage of the pipelined join (see product_join.py): enriches
+    customer-joined tuples with product master data and queues them for the DW.
+    Stops once the customer stage has finished and everything it produced is loaded.
+    """
+    stage = etl.product_join
+    hash_table = stage.hash_table
+    queue = stage.queue
+    product_disk_buffer = etl.product_disk_buffer
+    
+    while True:
+        # Pick up the refreshed product master
+        if stage.reload_due.is_set():
+            stage.reload_due.clear()
+            etl.reload_products()
+            product_disk_buffer = etl.product_disk_buffer
+        
+        # Steps 1-2: Load up to w joined tuples into the product hash table, keyed by Product_ID
+        idle = queue.is_empty()
+        items: list = stage.input.pop_many(hash_table.get_available_slots(), timeout=0.05 if idle else 0)
+        for item in items:
+            hash_table.insert(item[0][2], item)
+        
+        # Step 3: Get oldest product key from queue
+        oldest_key = queue.peek()
+        if oldest_key is None:
+            etl.loader.poll()
+            if stage.finished.is_set() and stage.input.is_empty():
+                break
+            continue
+        
+        # Step 4: Load disk partition for product master data
+        started = time.perf_counter()
+        product_partition = product_disk_buffer.load_partition(oldest_key)
+        
+        # Steps 5-9: Probe with every product in the partition, enrich and queue for the DW
+        for product_record in product_partition:
+            matches = hash_table.pop(str(product_record.get('Product_ID', '')))
+            stage.matched += len(matches)
+            for stream_tuple, customer_record in matches:
+                load_tuple(etl, stream_tuple, customer_record, product_record)
+        
+        # Step 11: Tuples of a product missing from the master use the resolver's price
+        unmatched = hash_table.pop(oldest_key)
+        stage.unmatched += len(unmatched)
+        for stream_tuple, customer_record in unmatched:
+            load_tuple(etl, stream_tuple, customer_record, None)
+        etl.product_join_seconds.since(started)
+        etl.product_partition_loads.inc()
+        stage.partition_loads += 1
+        
+        etl.loader.poll()
+    
+    # Flush the last batch
+    etl.loader.close()
+
 def hybridjoin_worker(etl: HybridJoinETL, stop_event: threading.Event) -> None:
     """
     Continuously runs the Hybrid Join algorithm.
@@ -183,119 +591,189 @@ def hybridjoin_worker(etl: HybridJoinETL, stop_event: threading.Event) -> None:
     stream_buffer = etl.stream_buffer
     hash_table = etl.hash_table
     queue = etl.queue
+    hot_keys = etl.hot_keys
+    product_join = etl.product_join
     customer_disk_buffer = etl.customer_disk_buffer
     product_disk_buffer = etl.product_disk_buffer
     
+    # Product enrichment runs as a pipelined stage in its own thread
+    if product_join is not None:
+        product_thread = threading.Thread(target=product_join_worker, args=(etl,),
+                                          name="product-join", daemon=True)
+        product_thread.start()
+    
     print("HYBRIDJOIN worker started")
     
     while not stop_event.is_set():
+        # Pick up refreshed master data (incremental dimension refresh)
+        if etl.refresh_due():
+            etl.reload_masters()
+            customer_disk_buffer = etl.customer_disk_buffer
+            product_disk_buffer = etl.product_disk_buffer
+        
+        # Periodic checkpoint, taken between iterations so no tuple is in transit
+        if etl.checkpointer:
+            etl.checkpointer.maybe_save(etl)
+        
         # Step 1: Check available hash table slots (w)
         slots_available = hash_table.get_available_slots()
         
         # Step 2: Load up to w stream tuples into hash table
-        loaded = 0
-        while loaded < slots_available and not stream_buffer.is_empty():
-            row: tuple = stream_buffer.pop()
-            if row is None:
-                break
-            
-            key = extract_key(row)  # Customer_ID
-            hash_table.insert(key, row)
-            queue.enqueue(key)
-            loaded += 1
-            
-            with etl.lock:
-                etl.processed_count += 1
-        
-        # Step 3: Get oldest key from queue
-        oldest_key = queue.dequeue()
-        if oldest_key is None:
-            # No data to process, wait a bit
-            time.sleep(0.01)
+        # (block briefly for new data only when there is nothing to join)
+        idle = queue.is_empty()
+        if idle and slots_available == 0:
+            # Every slot is held by the pending DW batch
+            etl.wait_commits()
             continue
+        started = time.perf_counter()
+        rows: list = stream_buffer.pop_many(slots_available, timeout=0.05 if idle else 0)
+        started = etl.buffer_wait_seconds.since(started)
+        joined = []  # (stream tuple, customer record) pairs awaiting product enrichment
+        if rows:
+            etl.processed.inc(len(rows))
+            if hot_keys is not None:
+                # Hot customers are joined at once from the resident cache
+                hot_rows, hot_records, rows = hot_keys.split(rows)
+                if hot_rows:
+                    hash_table.hold_many(hot_rows)
+                    joined.extend(zip(hot_rows, hot_records))
+                    now = time.time()
+                    etl.hot_join_wait_seconds.observe_many(now - row[-1] for row in hot_rows)
+            for row in rows:
+                key = extract_key(row)  # Customer_ID
+                hash_table.insert(key, row)  # enqueues the key if not already pending
+            etl.hash_insert_seconds.since(started)
         
-        # Step 4: Load disk partition for customer master data
-        customer_partition = customer_disk_buffer.load_partition(oldest_key)
-        if not customer_partition:
-            # No customer data found, skip
-            continue
-        
-        # Step 5: Probe hash table with customer partition
-        stream_matches = hash_table.get(oldest_key)
-        if not stream_matches:
-            # No matches for this key, continue to next key
-            continue
-        
-        # Step 6: Join stream tuples with customer master data
-        for stream_tuple in stream_matches:
-            orderID, Customer_ID, Product_ID, quantity, date = stream_tuple
-            
-            # Find matching customer record
-            customer_record = None
-            for cust_record in customer_partition:
-                if cust_record.get('Customer_ID') == Customer_ID:
-                    customer_record = cust_record
-                    break
-            
-            if customer_record is None:
-                continue
+        # Steps 3-11 run probes_per_refill times (more than once while freshness is behind SLA)
+        for _ in range(etl.probes_per_refill):
+            # Step 3: Get oldest key from queue
+            oldest_key = queue.peek()
+            if oldest_key is None:
+                break
             
-            # Step 7: Load product master data partition
-            product_partition = product_disk_buffer.load_partition(Product_ID)
-            product_record = None
+            # Step 4: Load disk partition for customer master data
+            started = time.perf_counter()
+            customer_partition = customer_disk_buffer.load_partition(oldest_key)
+            started = etl.partition_load_seconds.since(started)
+            matched = 0
+            first_probed = len(joined)
             
-            if product_partition:
-                # Find exact match
-                for prod in product_partition:
-                    if str(prod.get('Product_ID', '')) == Product_ID:
-                        product_record = prod
-                        break
-                
-                if product_record:
-                    purchase_amount = float(product_record.get('price$', 0)) * quantity
-                else:
-                    # Try lookup
-                    if Product_ID in etl.product_lookup:
-                        product_info = etl.product_lookup[Product_ID]
-                        purchase_amount = product_info['price'] * quantity
-                    else:
-                        continue
-            else:
-                # Try to get product info from lookup
-                if Product_ID in etl.product_lookup:
-                    product_info = etl.product_lookup[Product_ID]
-                    purchase_amount = product_info['price'] * quantity
-                else:
+            # Step 5: Probe hash table with every key in the customer partition
+            for customer_record in customer_partition:
+                # Matched tuples leave the queue now and the hash table once committed (Step 10)
+                customer_id = customer_record.get('Customer_ID')
+                stream_matches = hash_table.detach(customer_id)
+                if not stream_matches:
                     continue
+                matched += len(stream_matches)
+                if hot_keys is not None:
+                    # Frequency detection: keep customers with many matches resident
+                    hot_keys.observe(customer_id, customer_record, len(stream_matches))
+                
+                # Step 6: Join stream tuples with customer master data
+                for stream_tuple in stream_matches:
+                    joined.append((stream_tuple, customer_record))
+            etl.probe_seconds.since(started)
+            etl.partition_loads.inc()
+            etl.matched.inc(matched)
+            if hot_keys is not None and matched:
+                now = time.time()
+                etl.join_wait_seconds.observe_many(now - row[-1] for row, _ in joined[first_probed:])
             
-            # Step 8: Create enriched tuple
-            enriched_tuple = {
-                'orderID': orderID,
-                'Customer_ID': Customer_ID,
-                'Product_ID': Product_ID,
-                'quantity': quantity,
-                'date': date,
-                'purchase_amount': purchase_amount,
-                'customer_data': customer_record,
-                'product_data': product_record if product_partition else None
-            }
-            
-            # Step 9: Load enriched data into DW
-            success = etl.load_to_dw(enriched_tuple)
-            
-            if success:
-                # Step 10: Remove matched tuple from hash table
-                hash_table.delete(oldest_key, stream_tuple)
+            # Step 11: Expire tuples of the oldest key that could not be joined
+            expired = hash_table.pop(oldest_key)
+            if expired:
+                reason = f"Customer_ID {oldest_key} not in master data"
+                etl.expire([(stream_tuple, reason) for stream_tuple in expired])
+        
+        # Steps 7-9: Enrich with product data, in the product stage if pipelined
+        if product_join is not None:
+            product_join.input.push_many(joined)
+        elif joined:
+            started = time.perf_counter()
+            for stream_tuple, customer_record in joined:
+                join_tuple(etl, product_disk_buffer, stream_tuple, customer_record)
+            etl.product_join_seconds.since(started)
+        
+        # Flush the DW batch if it has waited long enough, or apply commits of the product stage
+        etl.poll_commits()
+        etl.check_freshness()
+        if etl.controller:
+            etl.controller.maybe_adjust()
     
-    # Close database connection
+    # Flush the last batch and close database connection
+    if product_join is not None:
+        # Let the product stage drain, then apply its last acknowledgements
+        product_join.finished.set()
+        product_thread.join()
+        etl.poll_commits()
+    elif etl.loader:
+        etl.loader.close()
+    etl.flush_unmatched(0)
+    if etl.checkpointer:
+        etl.checkpointer.save(etl)
     if etl.cur:
         etl.cur.close()
     if etl.conn and etl.conn.is_connected():
         etl.conn.close()
     
-    print(f"HYBRIDJOIN worker finished. Processed {etl.processed_count} transactions, loaded {etl.loaded_count} records.")
+    print(f"HYBRIDJOIN worker finished. Processed {etl.processed_count} transactions, loaded {etl.loaded_count} records, "
+          f"dropped {etl.unmatched_count} unmatched.")
+    print(f"Customer partition cache: {etl.customer_cache.stats()}")
+    print(f"Product partition cache: {etl.product_cache.stats()}")
+    if product_join is not None:
+        print(f"Product stage: {product_join.stats()}")
+    print(f"Surrogate keys: {etl.key_resolver.stats()}")
+    if hot_keys is not None:
+        print(f"Hot-key cache: {hot_keys.stats()}")
+        print(f"Join wait p99 (s): hot keys {etl.hot_join_wait_seconds.quantile(0.99)}, "
+              f"probed {etl.join_wait_seconds.quantile(0.99)}")
+    print(f"Stage latency p50/p99 (s): {etl.stage_latencies()}")
+    print(f"Freshness (s): {etl.freshness.stats()}, SLA breaches: {etl.freshness.breaches}")
+
+# Join engines: tuple-at-a-time HYBRIDJOIN or column-wise micro-batches
+ENGINES = {
+    "hybridjoin": hybridjoin_worker,
+    "vectorized": vectorized_worker,
+}
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="HYBRIDJOIN ETL System")
+    parser.add_argument("--engine", choices=list(ENGINES), default="hybridjoin",
+                        help="join engine (vectorized: micro-batches for throughput over per-tuple latency)")
+    parser.add_argument("--micro-batch", type=int, default=5000,
+                        help="vectorized engine: tuples per micro-batch")
+    parser.add_argument("--micro-batch-ms", type=float, default=50,
+                        help="vectorized engine: longest wait in milliseconds to fill a micro-batch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of key-sharded worker processes (1 = single join thread)")
+    parser.add_argument("--writers", type=int, default=0,
+                        help="number of DW writer threads per join (0 = write from the join thread)")
+    parser.add_argument("--arrivals", choices=list(PROFILES), default="constant",
+                        help="arrival profile of the simulated stream")
+    parser.add_argument("--rate", type=float, default=10000,
+                        help="mean arrival rate in tuples per second (replay: speedup of one day)")
+    parser.add_argument("--metrics-file",
+                        help="write Prometheus metrics to this file (textfile collector format)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--sla", type=float, default=5.0,
+                        help="freshness SLA in seconds (arrival to DW commit)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="resize the hash table and partitions at runtime (hybridjoin engine; decisions in logs/)")
+    parser.add_argument("--memory-limit-mb", type=float,
+                        help="memory budget the adaptive controller keeps headroom under")
+    parser.add_argument("--hot-keys", type=int, default=0,
+                        help="customers kept resident for immediate joins (0 = disabled, the default)")
+    parser.add_argument("--inline-products", action="store_true",
+                        help="enrich with product data in the join thread instead of a pipelined stage")
+    parser.add_argument("--aggregates", action="store_true",
+                        help="maintain the summary tables (see aggregate_queries.sql) with every FactSales batch")
+    parser.add_argument("--fresh", action="store_true",
+                        help="discard the last checkpoint and read the stream from the start")
+    args = parser.parse_args()
+    
     # Get database credentials
     print("HYBRIDJOIN ETL System")
     print("=" * 50)
@@ -308,14 +786,70 @@ if __name__ == "__main__":
     CUSTOMER_MASTER_CSV = os.path.join(script_dir, '../../data/customer_master_data.csv')
     PRODUCT_MASTER_CSV = os.path.join(script_dir, '../../data/product_master_data.csv')
     
-    # Initialize ETL system
-    etl = HybridJoinETL(
+    # Convert master data into memory-mapped page stores (once)
+    CUSTOMER_MASTER_PAGES = os.path.splitext(CUSTOMER_MASTER_CSV)[0] + EXTENSION
+    PRODUCT_MASTER_PAGES = os.path.splitext(PRODUCT_MASTER_CSV)[0] + EXTENSION
+    for csv_path, pages_path, key_column in ((CUSTOMER_MASTER_CSV, CUSTOMER_MASTER_PAGES, "Customer_ID"),
+                                              (PRODUCT_MASTER_CSV, PRODUCT_MASTER_PAGES, "Product_ID")):
+        ensure_page_store(csv_path, pages_path, key_column, page_size=500)
+    
+    # ETL configuration (stream buffer bounded at 100k tuples with backpressure)
+    vectorized = args.engine == "vectorized"
+    engine_kwargs = dict(batch_size=args.micro_batch, batch_latency=args.micro_batch_ms / 1000) if vectorized else {}
+    etl_kwargs = dict(
         db_user=db_user,
         db_password=db_password,
         transaction_csv=TRANSACTION_CSV,
         customer_master_csv=CUSTOMER_MASTER_CSV,
-        product_master_csv=PRODUCT_MASTER_CSV
+        product_master_csv=PRODUCT_MASTER_CSV,
+        customer_master_pages=CUSTOMER_MASTER_PAGES,
+        product_master_pages=PRODUCT_MASTER_PAGES,
+        buffer_capacity=100000,
+        buffer_policy="block",
+        writers=args.writers,
+        refresh_marker=os.path.join(script_dir, '../../data/.snapshots/REFRESH'),
+        freshness_sla=args.sla,
+        adaptive=args.adaptive,
+        memory_limit_mb=args.memory_limit_mb,
+        hot_keys=0 if vectorized else args.hot_keys,
+        product_stage=not (vectorized or args.inline_products),
+        aggregates=args.aggregates
     )
+    CHECKPOINT_PATH = os.path.join(script_dir, '../../data/.checkpoint/etl.ckpt')
+    if args.fresh and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    
+    if args.workers > 1:
+        # Parallel mode: one HYBRIDJOIN per Customer_ID shard
+        from parallel import ParallelHybridJoin
+        parallel = ParallelHybridJoin(etl_kwargs, args.workers, engine=args.engine, engine_kwargs=engine_kwargs,
+                                      arrivals=make_profile(args.arrivals, args.rate))
+        print(f"\nStarting ETL process with {args.workers} worker processes...")
+        parallel.start()
+        
+        try:
+            while True:
+                time.sleep(3)
+                processed, loaded = parallel.totals()
+                print(f"Progress: Processed {processed} transactions, Loaded {loaded} records into DW")
+                print(f"Shards (processed, loaded): {parallel.shard_counts()}")
+                if not parallel.is_alive():
+                    break
+        
+        except KeyboardInterrupt:
+            # Shards ignore SIGINT; they stop on the stop event and flush their last batch
+            print("\nStopping ETL process, waiting for the shards to flush...")
+            parallel.stop()
+        
+        processed, loaded = parallel.totals()
+        print(f"\nETL Complete!")
+        print(f"Total processed: {processed}")
+        print(f"Total loaded to DW: {loaded}")
+        sys.exit(0)
+    
+    # Initialize ETL system
+    etl = HybridJoinETL(**etl_kwargs, checkpoint_path=CHECKPOINT_PATH)
+    start_offset = etl.restore_checkpoint()
     
     # Create stop event for graceful shutdown
     stop_event = threading.Event()
@@ -324,14 +858,24 @@ if __name__ == "__main__":
     feeder_thread = threading.Thread(
         target=stream_feeder,
         args=(etl.stream_buffer, TRANSACTION_CSV, stop_event),
+        kwargs=dict(start_offset=start_offset,
+                    arrivals=make_profile(args.arrivals, args.rate),
+                    feed_timer=etl.feed_seconds),
         daemon=True
     )
     join_thread = threading.Thread(
-        target=hybridjoin_worker,
+        target=ENGINES[args.engine],
         args=(etl, stop_event),
+        kwargs=engine_kwargs,
         daemon=True
     )
     
+    # Export metrics
+    if args.metrics_file:
+        etl.metrics.export_textfile(args.metrics_file)
+    if args.metrics_port:
+        etl.metrics.serve(args.metrics_port)
+    
     # Start threads
     print("\nStarting ETL process...")
     feeder_thread.start()
@@ -341,8 +885,8 @@ if __name__ == "__main__":
         # Keep main thread alive and monitor progress
         while True:
             time.sleep(3)
-            with etl.lock:
-                print(f"Progress: Processed {etl.processed_count} transactions, Loaded {etl.loaded_count} records into DW")
+            print(f"Progress: Processed {etl.processed_count} transactions, Loaded {etl.loaded_count} records into DW")
+            print(f"Stream buffer: {etl.stream_buffer.stats()}")
             
             # Check if threads are still alive
             if not feeder_thread.is_alive() and not join_thread.is_alive():
@@ -353,6 +897,9 @@ if __name__ == "__main__":
         stop_event.set()
         time.sleep(2)
     
+    etl.stream_buffer.close()
+    etl.metrics.close()
     print(f"\nETL Complete!")
     print(f"Total processed: {etl.processed_count}")
     print(f"Total loaded to DW: {etl.loaded_count}")
+    print(f"Total unmatched (see logs/Unmatched.log): {etl.unmatched_count}")
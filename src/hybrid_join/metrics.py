@@ -0,0 +1,211 @@
+"""
+Metrics: Low-overhead counters, gauges and latency histograms for the ETL stages, exported
+in the Prometheus text format to a file (for the node_exporter textfile collector) or from
+a local HTTP endpoint.
+
+Counters and histograms keep one cell per thread. A thread only ever writes its own cell,
+so updates take no lock; readers sum the cells when metrics are exported. Gauges are
+callables evaluated at export time (buffer depth, hash-table entries, ...).
+
+Stages instrumented by the ETL (all histograms in seconds):
+    hybridjoin_feed_seconds              feeder (or shard receiver): pushing one batch into the stream buffer
+    hybridjoin_buffer_wait_seconds       join: waiting on the stream buffer for tuples
+    hybridjoin_hash_insert_seconds       join: inserting one popped batch into the hash table
+    hybridjoin_partition_load_seconds    join: loading one customer partition
+    hybridjoin_probe_seconds             join: probing the hash table with one partition
+    hybridjoin_db_write_seconds          loader: writing one FactSales batch
+    hybridjoin_commit_seconds            loader: committing one FactSales batch
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency buckets, 10 us to 10 s
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+class _ThreadCells:
+    """One list of values per thread; only the owning thread writes its list"""
+    def __init__(self, size: int):
+        self.size = size
+        self.cells = {}  # thread id -> list, replaced (copy on write) when a thread is added
+        self.lock = threading.Lock()
+
+    def cell(self) -> list:
+        ident = threading.get_ident()
+        cell = self.cells.get(ident)
+        if cell is None:
+            with self.lock:
+                cell = [0] * self.size
+                self.cells = {**self.cells, ident: cell}
+        return cell
+
+    def totals(self) -> list:
+        totals = [0] * self.size
+        for cell in self.cells.values():
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.cells = _ThreadCells(1)
+
+    def inc(self, amount: int = 1) -> None:
+        self.cells.cell()[0] += amount
+
+    def value(self) -> int:
+        return self.cells.totals()[0]
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter",
+                f"{self.name} {self.value()}"]
+
+class Gauge:
+    def __init__(self, name: str, help: str, func):
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def value(self) -> float:
+        return self.func()
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self.value()}"]
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Per thread: one count per bucket, +Inf, then the sum of observations
+        self.cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self.cells.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def observe_many(self, values) -> None:
+        """Observe a batch of values with a single cell lookup"""
+        cell = self.cells.cell()
+        buckets = self.buckets
+        for value in values:
+            cell[bisect_left(buckets, value)] += 1
+            cell[-1] += value
+
+    def since(self, started: float) -> float:
+        """Observe the time elapsed since started (a time.perf_counter() value); returns now"""
+        now = time.perf_counter()
+        self.observe(now - started)
+        return now
+
+    def snapshot(self) -> tuple:
+        """(cumulative bucket counts, count, sum)"""
+        totals = self.cells.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile"""
+        cumulative, count, _ = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        for bound, running in zip(self.buckets, cumulative):
+            if running >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> list:
+        cumulative, count, total = self.snapshot()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for bound, running in zip(self.buckets, cumulative):
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {running}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+class Metrics:
+    def __init__(self, prefix: str = "hybridjoin"):
+        self.prefix = prefix
+        self.metrics = {}
+        self.server = None
+        self.exporter = None
+        self.stop_event = threading.Event()
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help))
+
+    def gauge(self, name: str, help: str, func) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help, func))
+
+    def histogram(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Write the metrics atomically (the textfile collector may read at any time)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+    def export_textfile(self, path: str, interval: float = 5.0) -> None:
+        """Rewrite the text file every interval seconds from a background thread"""
+        def export() -> None:
+            while not self.stop_event.wait(interval):
+                self.write_textfile(path)
+            self.write_textfile(path)
+        self.exporter = threading.Thread(target=export, name="metrics-exporter", daemon=True)
+        self.exporter.start()
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serve the metrics at http://host:port/metrics from a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def close(self) -> None:
+        self.stop_event.set()
+        if self.exporter is not None:
+            self.exporter.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
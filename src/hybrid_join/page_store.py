@@ -0,0 +1,173 @@
+"""
+Page Store: An out-of-core copy of a master table (R) for the Disk Buffer. R is written
+once, sorted on the join key, as fixed-size pages of page_size records followed by a small
+page directory (first/last key and byte range of every page). The file is memory-mapped
+and only the page a probe needs is decoded, so resident memory is bounded by the disk
+buffer size rather than by the size of R.
+
+File layout: header (magic, directory offset, directory length) | pages | directory
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import pickle
+import struct
+import tempfile
+from bisect import bisect_right
+from operator import itemgetter
+import pandas as pd
+
+MAGIC = b"HJPAGES1"
+HEADER = struct.Struct("<8sQQ")
+EXTENSION = ".pages"
+
+def _coerce_key(key_column: str, key):
+    """Match the key type used by the join (Customer_ID is int, Product_ID is str)"""
+    if key_column == "Customer_ID":
+        return int(key)
+    elif key_column == "Product_ID":
+        return str(key)
+    return key
+
+def _write_run(records: list, run_dir: str) -> str:
+    """Write one sorted run as a sequence of pickled records"""
+    fd, path = tempfile.mkstemp(suffix=".run", dir=run_dir)
+    with os.fdopen(fd, "wb") as file:
+        for record in records:
+            pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_run(path: str):
+    """Yield the records of a sorted run"""
+    with open(path, "rb") as file:
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                return
+
+def build_page_store(csv_path: str, out_path: str, key_column: str,
+                     page_size: int = 500, chunk_rows: int = 100000) -> int:
+    """
+    Convert a master CSV into a page store sorted on key_column.
+    The CSV is read in chunks and merged from sorted runs, so R never has to fit in memory.
+    Returns the number of pages written.
+    """
+    run_dir = tempfile.mkdtemp(prefix="pagestore_", dir=os.path.dirname(os.path.abspath(out_path)))
+    runs = []
+    try:
+        # Pass 1: sorted runs of at most chunk_rows records
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            records = chunk.to_dict("records")
+            for record in records:
+                record[key_column] = _coerce_key(key_column, record[key_column])
+            records.sort(key=itemgetter(key_column))
+            runs.append(_write_run(records, run_dir))
+
+        # Pass 2: merge runs into fixed-size pages
+        first_keys, last_keys, offsets, lengths = [], [], [], []
+        n_rows = 0
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, 0, 0))
+            page = []
+            merged = heapq.merge(*[_read_run(run) for run in runs], key=itemgetter(key_column))
+            for record in merged:
+                page.append(record)
+                if len(page) == page_size:
+                    n_rows += len(page)
+                    _write_page(file, page, key_column, first_keys, last_keys, offsets, lengths)
+                    page = []
+            if page:
+                n_rows += len(page)
+                _write_page(file, page, key_column, first_keys, last_keys, offsets, lengths)
+
+            directory = pickle.dumps({
+                "key_column": key_column,
+                "page_size": page_size,
+                "n_rows": n_rows,
+                "first_keys": first_keys,
+                "last_keys": last_keys,
+                "offsets": offsets,
+                "lengths": lengths,
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+            dir_offset = file.tell()
+            file.write(directory)
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, dir_offset, len(directory)))
+        os.replace(tmp_path, out_path)
+    finally:
+        for run in runs:
+            os.remove(run)
+        os.rmdir(run_dir)
+
+    return len(offsets)
+
+def _write_page(file, page: list, key_column: str, first_keys: list, last_keys: list,
+                offsets: list, lengths: list) -> None:
+    """Append one encoded page and record it in the directory"""
+    data = pickle.dumps(page, protocol=pickle.HIGHEST_PROTOCOL)
+    first_keys.append(page[0][key_column])
+    last_keys.append(page[-1][key_column])
+    offsets.append(file.tell())
+    lengths.append(len(data))
+    file.write(data)
+
+def ensure_page_store(csv_path: str, out_path: str, key_column: str, page_size: int = 500) -> bool:
+    """(Re)build a page store if it is missing or older than its CSV. Returns True if built."""
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(csv_path):
+        return False
+    print(f"Building page store {os.path.basename(out_path)}...")
+    build_page_store(csv_path, out_path, key_column, page_size=page_size)
+    return True
+
+class PageStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, dir_offset, dir_length = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a page store")
+        directory = pickle.loads(self.mm[dir_offset:dir_offset + dir_length])
+
+        self.key_column = directory["key_column"]
+        self.page_size = directory["page_size"]
+        self.n_rows = directory["n_rows"]
+        self.first_keys = directory["first_keys"]
+        self.last_keys = directory["last_keys"]
+        self.offsets = directory["offsets"]
+        self.lengths = directory["lengths"]
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def find_page(self, key) -> int | None:
+        """Return the index of the page whose key range covers key, or None"""
+        index = bisect_right(self.first_keys, key) - 1
+        if index < 0 or key > self.last_keys[index]:
+            return None
+        return index
+
+    def read_page(self, index: int) -> list:
+        """Decode and return the records of one page"""
+        offset = self.offsets[index]
+        return pickle.loads(self.mm[offset:offset + self.lengths[index]])
+
+    def close(self) -> None:
+        self.mm.close()
+        self.file.close()
+
+if __name__ == "__main__":
+    # Convert the master data into page stores next to the CSVs
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(script_dir, '../../data')
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for name, key_column in (("customer_master_data", "Customer_ID"), ("product_master_data", "Product_ID")):
+        csv_path = os.path.join(data_dir, name + ".csv")
+        out_path = os.path.join(data_dir, name + EXTENSION)
+        pages = build_page_store(csv_path, out_path, key_column, page_size=page_size)
+        print(f"Wrote {pages} pages to {out_path}")
@@ -0,0 +1,139 @@
+"""
+Parallel HYBRIDJOIN: Shards the stream by hash of Customer_ID across N worker processes.
+Each worker owns a complete HybridJoinETL (stream buffer, hash table, queue, disk-buffer
+view of the page stores and DB connection) and runs the ordinary worker of the chosen join
+engine (hybridjoin_worker by default), so tuples of one customer always meet the same hash
+table. A dispatcher thread in the parent reads the transactional CSV and routes tuple
+batches to the shards, paced by the same arrival profile as the single-process feeder.
+
+Shards ignore SIGINT: on Ctrl+C the parent sets the stop event and waits while every shard
+stops its join, flushes its last FactSales batch and closes its connection.
+
+Each shard publishes its processed/loaded counts into a shared array that the parent
+aggregates for the progress report.
+"""
+
+import time
+import signal
+import threading
+import multiprocessing as mp
+import pandas as pd
+from main import HybridJoinETL, TRANSACTION_DTYPES, ENGINES, generate_tuples
+from arrivals import ConstantRate, Pacer
+
+def shard_of(customer_id: int, n_shards: int) -> int:
+    """Shard index of a Customer_ID"""
+    return hash(customer_id) % n_shards
+
+def dispatcher(csv_path: str, shard_queues: list, stop_event, chunk_size: int = 10000,
+               batch_size: int = 100, delay: float = 0.0001, arrivals=None) -> None:
+    """
+    Read the CSV in chunks and route tuples to their shards in batches of batch_size,
+    each sent when due under the arrival profile (like stream_feeder).
+    """
+    n_shards = len(shard_queues)
+    pacer = Pacer(arrivals or ConstantRate(1.0 / delay))
+    idx = 0
+    reader = pd.read_csv(csv_path, usecols=list(TRANSACTION_DTYPES), dtype=TRANSACTION_DTYPES,
+                         chunksize=chunk_size)
+
+    for chunk in reader:
+        # Same as shard_of: hash() of an int Customer_ID is the int itself
+        shards = (chunk['Customer_ID'] % n_shards).tolist()
+        tuples = generate_tuples(chunk)
+        for start in range(0, len(tuples), batch_size):
+            if stop_event.is_set():
+                break
+            batch = tuples[start:start + batch_size]
+            # Simulate streaming delay: wait until the batch is due
+            pacer.wait(batch)
+            batches = [[] for _ in range(n_shards)]
+            for tup, shard in zip(batch, shards[start:start + batch_size]):
+                batches[shard].append(tup)
+            for shard_queue, shard_batch in zip(shard_queues, batches):
+                if shard_batch:
+                    shard_queue.put(shard_batch)
+            idx += len(batch)
+        if stop_event.is_set():
+            break
+
+    for shard_queue in shard_queues:
+        shard_queue.put(None)  # end of stream
+    print(f"Dispatcher finished. Routed {idx} transactions to {n_shards} shards.")
+
+def shard_worker(shard_id: int, etl_kwargs: dict, shard_queue, counters, stop_event,
+                 engine: str = "hybridjoin", engine_kwargs: dict = None) -> None:
+    """Run one shard: feed its stream buffer from the dispatcher queue and join"""
+    # Ctrl+C reaches every process of the group; only the stop event shuts a shard down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    etl = HybridJoinETL(**etl_kwargs)
+
+    def receive() -> None:
+        while not stop_event.is_set():
+            batch = shard_queue.get()
+            if batch is None:
+                break
+            started = time.perf_counter()
+            etl.stream_buffer.push_many(batch)
+            etl.feed_seconds.since(started)
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    join_thread = threading.Thread(target=ENGINES[engine], args=(etl, stop_event),
+                                   kwargs=engine_kwargs or {}, daemon=True)
+    receiver.start()
+    join_thread.start()
+
+    # Publish counters until the join stops (after flushing its last batch)
+    while join_thread.is_alive():
+        join_thread.join(0.5)
+        counters[2 * shard_id] = etl.processed_count
+        counters[2 * shard_id + 1] = etl.loaded_count
+    etl.stream_buffer.close()
+
+class ParallelHybridJoin:
+    def __init__(self, etl_kwargs: dict, n_workers: int, queue_batches: int = 64,
+                 engine: str = "hybridjoin", engine_kwargs: dict = None, arrivals=None):
+        self.etl_kwargs = etl_kwargs
+        self.n_workers = n_workers
+        self.stop_event = mp.Event()
+        self.counters = mp.Array('q', 2 * n_workers, lock=False)  # processed, loaded per shard
+        self.shard_queues = [mp.Queue(maxsize=queue_batches) for _ in range(n_workers)]
+        self.workers = [
+            mp.Process(target=shard_worker,
+                       args=(i, etl_kwargs, self.shard_queues[i], self.counters, self.stop_event,
+                             engine, engine_kwargs),
+                       daemon=True)
+            for i in range(n_workers)
+        ]
+        self.dispatcher = threading.Thread(
+            target=dispatcher,
+            args=(etl_kwargs['transaction_csv'], self.shard_queues, self.stop_event),
+            kwargs=dict(arrivals=arrivals),
+            daemon=True
+        )
+
+    def start(self) -> None:
+        for worker in self.workers:
+            worker.start()
+        self.dispatcher.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """Stop every shard and wait until each has flushed and exited (timeout per shard)"""
+        self.stop_event.set()
+        for shard_queue in self.shard_queues:
+            # Tuples still queued for a stopped shard must not keep the parent from exiting
+            shard_queue.cancel_join_thread()
+        for worker in self.workers:
+            worker.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self.dispatcher.is_alive() or any(worker.is_alive() for worker in self.workers)
+
+    def shard_counts(self) -> list:
+        """(processed, loaded) per shard"""
+        return [(self.counters[2 * i], self.counters[2 * i + 1]) for i in range(self.n_workers)]
+
+    def totals(self) -> tuple:
+        """Aggregated (processed, loaded) over all shards"""
+        counts = self.shard_counts()
+        return sum(c[0] for c in counts), sum(c[1] for c in counts)
@@ -0,0 +1,107 @@
+"""
+Partition Cache: A size-bounded cache of decoded disk partitions, placed in front of a
+Disk Buffer. Keys dequeued close together often fall into the same partition of R, so
+recently loaded partitions are kept and reused instead of being decoded again.
+
+Eviction policy is either "lru" (least recently used) or "lfu" (least frequently used,
+ties broken by recency). Hit, miss and eviction counts are kept for sizing the cache.
+Cached partitions are shared between callers and must not be modified.
+"""
+
+from collections import OrderedDict
+
+class PartitionCache:
+    def __init__(self, capacity: int = 32, policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.entries = OrderedDict()  # partition index -> records (recency order for LRU)
+        self.freq = {}  # LFU: partition index -> use count
+        self.freq_buckets = {}  # LFU: use count -> OrderedDict of partition indexes
+        self.min_freq = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _touch(self, index: int) -> None:
+        """Record a use of a cached partition"""
+        if self.policy == "lru":
+            self.entries.move_to_end(index)
+            return
+        count = self.freq[index]
+        bucket = self.freq_buckets[count]
+        del bucket[index]
+        if not bucket:
+            del self.freq_buckets[count]
+            if self.min_freq == count:
+                self.min_freq = count + 1
+        self.freq[index] = count + 1
+        self.freq_buckets.setdefault(count + 1, OrderedDict())[index] = None
+
+    def _evict(self) -> None:
+        """Drop one partition according to the eviction policy"""
+        if self.policy == "lru":
+            self.entries.popitem(last=False)
+        else:
+            bucket = self.freq_buckets[self.min_freq]
+            index, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.freq_buckets[self.min_freq]
+            del self.freq[index]
+            del self.entries[index]
+        self.evictions += 1
+
+    def get(self, index: int) -> list | None:
+        """Return the cached partition or None on a miss"""
+        records = self.entries.get(index)
+        if records is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(index)
+        return records
+
+    def put(self, index: int, records: list) -> None:
+        """Cache a decoded partition, evicting if the cache is full"""
+        if self.capacity <= 0:
+            return
+        if index in self.entries:
+            self.entries[index] = records
+            self._touch(index)
+            return
+        if len(self.entries) >= self.capacity:
+            self._evict()
+        self.entries[index] = records
+        if self.policy == "lfu":
+            self.freq[index] = 1
+            self.freq_buckets.setdefault(1, OrderedDict())[index] = None
+            self.min_freq = 1
+
+    def clear(self) -> None:
+        """Drop all cached partitions (statistics are kept)"""
+        self.entries.clear()
+        self.freq.clear()
+        self.freq_buckets.clear()
+        self.min_freq = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counts"""
+        return {
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate(), 4),
+        }
@@ -0,0 +1,72 @@
+"""
+Product Join: The second stage of a pipelined HYBRIDJOIN. Stream tuples joined with their
+customer record are pushed into this stage's own input buffer and enriched with product
+master data by a separate thread, so customer and product enrichment overlap.
+
+The stage mirrors the customer join: an input buffer, a hash table keyed by Product_ID and
+a queue of pending product keys. Each iteration loads the product partition of the oldest
+pending key and probes the hash table with every product in it, so one partition load
+serves all pending tuples of those products. Tuples of a product missing from the master
+fall back to the surrogate-key resolver's price.
+
+Every tuple in this stage still holds its slot in the customer hash table (detached or
+held), so the stage is bounded by hS and covered by checkpoints. The product thread owns
+the DW loader; commit acknowledgements and tuples that cannot be loaded are queued here and
+applied by the customer thread (poll), so the customer hash table is only ever touched by
+its own thread.
+"""
+
+import threading
+from collections import deque
+from stream_buffer import StreamBuffer
+from hash_table import HashTable
+from key_queue import Queue
+
+class ProductJoin:
+    def __init__(self, hS: int = 10000):
+        self.input = StreamBuffer(stamp=False)  # (stream tuple, customer record) pairs
+        self.queue = Queue()
+        self.hash_table = HashTable(hS=hS, queue=self.queue)
+
+        self.acks = deque()  # (committed, failed) per DW batch, applied by the customer thread
+        self.discarded = deque()  # joined tuples that cannot be loaded, released by the customer thread
+        self.acked = threading.Condition()
+        self.finished = threading.Event()  # set by the customer thread once it stops producing
+        self.reload_due = threading.Event()  # product master refreshed
+
+        # Statistics
+        self.partition_loads = 0
+        self.matched = 0
+        self.unmatched = 0  # tuples whose product is not in the master (resolver fallback)
+
+    def pending(self) -> int:
+        """Tuples waiting in the stage (input buffer and hash table)"""
+        return self.input.size() + self.hash_table.get_total_entries()
+
+    def on_commit(self, committed: list, failed: list, loaded: int = None) -> None:
+        """Loader callback (product thread): queue the acknowledgement for the customer thread"""
+        with self.acked:
+            self.acks.append((committed, failed, loaded))
+            self.acked.notify_all()
+
+    def poll(self, on_commit, release) -> None:
+        """Apply queued acknowledgements and release discarded tuples in the calling (customer) thread"""
+        while self.acks:
+            on_commit(*self.acks.popleft())
+        if self.discarded:
+            release([self.discarded.popleft() for _ in range(len(self.discarded))])
+
+    def wait(self, timeout: float, on_commit, release) -> None:
+        """Wait up to timeout seconds for the next acknowledgement, then apply all received"""
+        with self.acked:
+            if not self.acks:
+                self.acked.wait(timeout)
+        self.poll(on_commit, release)
+
+    def stats(self) -> dict:
+        return {
+            "partition_loads": self.partition_loads,
+            "matched": self.matched,
+            "matches_per_load": round(self.matched / self.partition_loads, 2) if self.partition_loads else 0.0,
+            "unmatched": self.unmatched,
+        }
@@ -1,20 +1,101 @@
 """
 Stream Buffer: A small buffer to temporarily hold incoming stream tuples if the algorithm
 can't process them immediately. This prevents loss of data in bursty scenarios.
+
+Every tuple is stamped with its arrival time (time.time(), appended as the last field)
+when it is pushed, so freshness can be measured up to the DW commit. Buffers between
+internal stages (stamp=False) keep the tuples as they are.
+
+Consumers can pop in batches and block on a condition variable until data arrives (or a
+timeout expires), so the join thread wakes as soon as the feeder pushes.
+
+The buffer can be bounded with a capacity and high/low watermarks. When the depth reaches
+the high watermark the overflow policy applies until it falls back to the low watermark:
+    "block"       - the producer waits (backpressure); waiting time is recorded
+    "spill"       - new tuples go to a local disk queue and are read back in FIFO order
+    "drop_oldest" - the oldest tuples are discarded to make room and counted
 """
 
 from collections import deque
 from datetime import datetime
+import os
+import time
+import pickle
+import tempfile
 import threading
 
+POLICIES = ("block", "spill", "drop_oldest")
+
+class SpillQueue:
+    """A FIFO of pickled tuples in a local file"""
+    def __init__(self, path: str = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="stream_spill_", suffix=".bin")
+            os.close(fd)
+        self.path = path
+        self.writer = open(path, "wb")
+        self.reader = open(path, "rb")
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def extend(self, items: list) -> None:
+        for item in items:
+            pickle.dump(item, self.writer, protocol=pickle.HIGHEST_PROTOCOL)
+        self.writer.flush()
+        self.count += len(items)
+
+    def pop_many(self, n: int) -> list:
+        items = []
+        while self.count and len(items) < n:
+            items.append(pickle.load(self.reader))
+            self.count -= 1
+        if not self.count:
+            # Drained: reuse the file from the start
+            self.writer.seek(0)
+            self.writer.truncate()
+            self.reader.seek(0)
+        return items
+
+    def items(self) -> list:
+        """Return the spilled tuples without consuming them"""
+        position = self.reader.tell()
+        items = [pickle.load(self.reader) for _ in range(self.count)]
+        self.reader.seek(position)
+        return items
+
+    def close(self) -> None:
+        self.writer.close()
+        self.reader.close()
+        os.remove(self.path)
+
 class StreamBuffer:
-    def __init__(self):
-        self.buffer = deque()  
+    def __init__(self, capacity: int = None, high_watermark: int = None, low_watermark: int = None,
+                 policy: str = "block", spill_path: str = None, stamp: bool = True):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.buffer = deque()
         self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+        # Bounds (None = unbounded)
+        self.capacity = capacity
+        self.high_watermark = high_watermark or capacity
+        self.low_watermark = low_watermark if low_watermark is not None else (capacity // 2 if capacity else None)
+        self.policy = policy
+        self.stamp = stamp
+        self.spill = SpillQueue(spill_path) if capacity and policy == "spill" else None
+
+        # Statistics
+        self.pushed = 0  # tuples accepted since the start of the stream (checkpoint offset)
+        self.throttled_seconds = 0.0
+        self.dropped = 0
+        self.spilled = 0
 
     @staticmethod
     def log_stream(message: str) -> None:
-        import os
         script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         log_dir = os.path.join(script_dir, 'logs')
         os.makedirs(log_dir, exist_ok=True)
@@ -23,32 +104,145 @@ class StreamBuffer:
         with open(log_path, "a", encoding="utf-8") as file:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             file.write(f"[{timestamp}] - {message}\n")
-        
+
     def push(self, data: tuple) -> None:
-        with self.lock:
-            self.buffer.append(data)
+        self.push_many([data])
         #log_message: str = f"Added: {data}, Buffer: {list(self.buffer)}"
         #self.log_stream(log_message)
 
-    def pop(self) -> tuple | None:
+    def push_many(self, data: list) -> None:
+        """Push a batch of tuples under a single lock acquisition"""
+        if not data:
+            return
+        if self.stamp:
+            # Stamp each tuple with its arrival time
+            arrived = time.time()
+            data = [row + (arrived,) for row in data]
+        with self.lock:
+            if self.capacity is None:
+                self.buffer.extend(data)
+                self.pushed += len(data)
+            elif self.policy == "block":
+                self._push_blocking(data)
+            elif self.policy == "spill":
+                self._push_spilling(data)
+                self.pushed += len(data)
+            else:
+                self._push_dropping(data)
+                self.pushed += len(data)
+            self.not_empty.notify()
+
+    def _push_blocking(self, data: list) -> None:
+        """
+        Admit tuples up to the high watermark, then wait for the low watermark.
+        pushed grows with every admitted slice: the wait releases the lock, and a checkpoint
+        taken meanwhile must not count tuples that are not in the buffer yet.
+        """
+        buffer = self.buffer
+        start = 0
+        while start < len(data):
+            if len(buffer) >= self.high_watermark:
+                self.not_empty.notify()
+                waited = time.monotonic()
+                self.not_full.wait_for(lambda: len(buffer) <= self.low_watermark)
+                self.throttled_seconds += time.monotonic() - waited
+            admitted = data[start:start + self.high_watermark - len(buffer)]
+            buffer.extend(admitted)
+            self.pushed += len(admitted)
+            start += len(admitted)
+
+    def _push_spilling(self, data: list) -> None:
+        """Keep FIFO order: once spilling, everything goes to disk until it drains"""
+        room = 0 if len(self.spill) else max(0, self.high_watermark - len(self.buffer))
+        self.buffer.extend(data[:room])
+        if room < len(data):
+            self.spill.extend(data[room:])
+            self.spilled += len(data) - room
+
+    def _push_dropping(self, data: list) -> None:
+        buffer = self.buffer
+        buffer.extend(data)
+        overflow = len(buffer) - self.capacity
+        if overflow > 0:
+            for _ in range(overflow):
+                buffer.popleft()
+            self.dropped += overflow
+
+    def _after_pop(self) -> None:
+        """Refill from the spill queue or release a blocked producer below the low watermark"""
+        if self.capacity is None or len(self.buffer) > self.low_watermark:
+            return
+        if self.spill is not None and len(self.spill):
+            self.buffer.extend(self.spill.pop_many(self.high_watermark - len(self.buffer)))
+        elif self.policy == "block":
+            self.not_full.notify_all()
+
+    def _wait_for_data(self, timeout: float) -> None:
+        if not self.buffer and timeout != 0:
+            self.not_empty.wait_for(lambda: self.buffer, timeout)
+
+    def pop(self, timeout: float = 0) -> tuple | None:
+        """Pop the oldest tuple, waiting up to timeout seconds (None waits forever)"""
         with self.lock:
+            self._wait_for_data(timeout)
             if self.buffer:
                 item = self.buffer.popleft()
+                self._after_pop()
                 #log_message: str = f"Retrieved: {item}, Buffer: {list(self.buffer)}"
                 #self.log_stream(log_message)
                 return item
-            else:
-                log_message: str = "Buffer empty!"
-                self.log_stream(log_message)
-                return None 
-        
+            return None
+
+    def pop_many(self, n: int, timeout: float = 0) -> list:
+        """Pop up to n tuples, waiting up to timeout seconds for the first (None waits forever)"""
+        if n <= 0:
+            return []
+        with self.lock:
+            self._wait_for_data(timeout)
+            buffer = self.buffer
+            count = min(n, len(buffer))
+            items = [buffer.popleft() for _ in range(count)]
+            if count:
+                self._after_pop()
+            return items
+
     def size(self) -> int:
+        """Current depth, including tuples spilled to disk"""
         with self.lock:
-            return len(self.buffer)   
+            return len(self.buffer) + (len(self.spill) if self.spill is not None else 0)
 
     def is_empty(self):
+        return self.size() == 0
+
+    def snapshot(self) -> tuple:
+        """(stream offset, buffered tuples including spilled ones), taken atomically"""
+        with self.lock:
+            items = list(self.buffer)
+            if self.spill is not None:
+                items.extend(self.spill.items())
+            return self.pushed, items
+
+    def restore(self, items: list, pushed: int) -> None:
+        """Reload buffered tuples from a checkpoint, ahead of the bounds"""
+        with self.lock:
+            self.buffer.extendleft(reversed(items))
+            self.pushed = pushed
+            self.not_empty.notify()
+
+    def stats(self) -> dict:
+        """Depth and backpressure counters"""
         with self.lock:
-            return len(self.buffer) == 0
+            return {
+                "depth": len(self.buffer),
+                "spill_depth": len(self.spill) if self.spill is not None else 0,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "spilled": self.spilled,
+                "dropped": self.dropped,
+            }
+
+    def close(self) -> None:
+        if self.spill is not None:
+            self.spill.close()
 
 if __name__=="__main__":
-    ...
\ No newline at end of file
+    ...
@@ -0,0 +1,134 @@
+"""
+Writer Pool: A pool of DW writer threads that decouples FactSales loading from the join
+thread. Enriched rows go into a bounded queue; each writer holds a pooled MySQL connection
+and a FactLoader that batches them. Writers align their COMMITs through GroupCommit so
+concurrent transactions reach the redo log together and share an fsync.
+
+Commit results are acknowledged asynchronously: writers record (committed, failed) token
+lists, and the join thread applies them (hash-table release) when it calls poll(), so the
+hash table is only ever touched by the join thread.
+
+The pool exposes the same add/add_many/poll/flush/close interface as FactLoader; a block
+queued with add_many goes to a single writer.
+"""
+
+import queue
+import threading
+from collections import deque
+import mysql.connector.pooling
+from fact_loader import FactLoader
+
+_STOP = object()
+
+class GroupCommit:
+    """Holds committing writers for up to window seconds so their COMMITs are issued together"""
+    def __init__(self, n_writers: int, window: float = 0.002):
+        self.n_writers = n_writers
+        self.window = window
+        self.cond = threading.Condition()
+        self.generation = 0
+        self.waiting = 0
+
+    def wait_turn(self) -> None:
+        with self.cond:
+            generation = self.generation
+            self.waiting += 1
+            if self.waiting == 1:
+                # Leader: wait for the other writers or the end of the window
+                self.cond.wait_for(lambda: self.waiting >= self.n_writers, self.window)
+                self.generation += 1
+                self.waiting = 0
+                self.cond.notify_all()
+            else:
+                if self.waiting >= self.n_writers:
+                    self.cond.notify_all()
+                self.cond.wait_for(lambda: self.generation != generation)
+
+class WriterPool:
+    def __init__(self, db_config: dict, n_writers: int = 4, queue_size: int = 10000,
+                 batch_size: int = 500, max_latency: float = 0.5, method: str = "executemany",
+                 on_commit=None, commit_window: float = 0.002, write_timer=None, commit_timer=None,
+                 aggregates: bool = False):
+        self.max_latency = max_latency
+        self.on_commit = on_commit
+        self.rows = queue.Queue(maxsize=queue_size)
+        self.acks = deque()  # (committed, failed) per batch, appended by writers
+        self.acked = threading.Condition()
+        self.group_commit = GroupCommit(n_writers, commit_window)
+
+        self.pool = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="dw_writers", pool_size=n_writers, **db_config
+        )
+        self.writers = []
+        self.loaders = []
+        for i in range(n_writers):
+            loader = FactLoader(self.pool.get_connection(), batch_size=batch_size,
+                                max_latency=max_latency, method=method,
+                                on_commit=self._ack, group_commit=self.group_commit,
+                                write_timer=write_timer, commit_timer=commit_timer, aggregates=aggregates)
+            self.loaders.append(loader)
+            writer = threading.Thread(target=self._write_loop, args=(loader,),
+                                      name=f"dw-writer-{i}", daemon=True)
+            self.writers.append(writer)
+            writer.start()
+
+    def _ack(self, committed: list, failed: list, loaded: int = None) -> None:
+        with self.acked:
+            self.acks.append((committed, failed, loaded))
+            self.acked.notify_all()
+
+    def _write_loop(self, loader: FactLoader) -> None:
+        while True:
+            try:
+                item = self.rows.get(timeout=loader.max_latency / 2)
+            except queue.Empty:
+                loader.poll()
+                continue
+            if item is _STOP:
+                break
+            loader.add_many(*item)
+            loader.poll()
+        loader.close()
+        loader.conn.close()  # return the connection to the pool
+        with self.group_commit.cond:
+            self.group_commit.n_writers -= 1
+
+    def add(self, row: tuple, token=None) -> None:
+        """Queue one FactSales row for the writers (blocks while the queue is full)"""
+        self.rows.put(([row], [token]))
+
+    def add_many(self, rows: list, tokens: list) -> None:
+        """Queue a block of FactSales rows for one writer"""
+        if rows:
+            self.rows.put((rows, tokens))
+
+    def pending(self) -> int:
+        return self.rows.qsize()
+
+    def set_batching(self, batch_size: int, max_latency: float) -> None:
+        """Change the flush thresholds of every writer"""
+        self.max_latency = max_latency
+        for loader in self.loaders:
+            loader.set_batching(batch_size, max_latency)
+
+    def poll(self) -> None:
+        """Apply commit acknowledgements in the calling (join) thread"""
+        while self.acks:
+            ack = self.acks.popleft()
+            if self.on_commit:
+                self.on_commit(*ack)
+
+    def flush(self) -> None:
+        """Wait up to max_latency for the next acknowledgement, then apply all received"""
+        with self.acked:
+            if not self.acks:
+                self.acked.wait(self.max_latency)
+        self.poll()
+
+    def close(self) -> None:
+        """Stop writers after they drain the queue, then apply the final acknowledgements"""
+        for _ in self.writers:
+            self.rows.put(_STOP)
+        for writer in self.writers:
+            writer.join()
+        self.poll()
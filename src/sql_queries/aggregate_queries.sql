@@ -0,0 +1,95 @@
+-- Aggregate-backed versions of Q2, Q4, Q9, Q12, Q18 and Q20 (see queries.sql).
+-- They read the summary tables AggStoreQuarter, AggProductMonth and AggSegmentMonth instead of
+-- scanning FactSales, so they are only current while the ETL runs with --aggregates. Run
+-- dw_config.py --rebuild-aggregates first if FactSales was loaded without it.
+-- Segments with an unknown Gender, Age or City_Category are grouped under '' instead of NULL.
+
+-- Q2. Customer Demographics by Purchase Amount with City Category Breakdown
+-- (reads AggSegmentMonth instead of FactSales)
+SELECT
+    a.Gender,
+    a.Age,
+    a.City_Category,
+    SUM(a.Revenue) AS total_purchase
+FROM AggSegmentMonth a
+GROUP BY a.Gender, a.Age, a.City_Category;
+
+-- Q4. Total Purchases by Gender and Age Group with Quarterly Trend
+-- (reads AggSegmentMonth instead of FactSales)
+SELECT
+    a.Gender,
+    a.Age AS age_group,
+    (a.Month + 2) DIV 3 AS Quarter,
+    SUM(a.Revenue) AS total_purchase
+FROM AggSegmentMonth a
+WHERE a.Year = 2020
+GROUP BY a.Gender, a.Age, Quarter;
+
+-- Q9. Monthly Sales Growth by Product Category
+-- (reads AggProductMonth instead of FactSales)
+WITH monthly AS (
+    SELECT
+        p.Product_Category AS category,
+        a.Month,
+        SUM(a.Revenue) AS revenue
+    FROM AggProductMonth a
+    JOIN DimProduct p ON a.Product_ID = p.Product_ID
+    WHERE a.Year = 2020
+    GROUP BY p.Product_Category, a.Month
+)
+SELECT
+    category,
+    Month,
+    revenue,
+    (revenue - LAG(revenue) OVER (PARTITION BY category ORDER BY Month))
+        / NULLIF(LAG(revenue) OVER (PARTITION BY category ORDER BY Month), 0) * 100
+        AS growth_percentage
+FROM monthly;
+
+-- Q12. Trend Analysis of Store Revenue Growth Rate Quarterly for 2017
+-- (reads AggStoreQuarter instead of FactSales)
+WITH q AS (
+    SELECT
+        s.Store_Name,
+        a.Quarter,
+        SUM(a.Revenue) AS revenue
+    FROM AggStoreQuarter a
+    JOIN DimStore s ON a.Store_ID = s.Store_ID
+    WHERE a.Year = 2017
+    GROUP BY s.Store_Name, a.Quarter
+)
+SELECT
+    Store_Name,
+    Quarter,
+    revenue,
+    (revenue - LAG(revenue) OVER (PARTITION BY Store_Name ORDER BY Quarter))
+        / NULLIF(LAG(revenue) OVER (PARTITION BY Store_Name ORDER BY Quarter), 0) * 100
+        AS growth_rate
+FROM q;
+
+-- Q18. Revenue and Volume-Based Sales Analysis for Each Product for H1 and H2
+-- (reads AggProductMonth instead of FactSales)
+SELECT
+    p.Product_Name,
+    SUM(CASE WHEN a.Month BETWEEN 1 AND 6 THEN a.Revenue END) AS revenue_h1,
+    SUM(CASE WHEN a.Month BETWEEN 7 AND 12 THEN a.Revenue END) AS revenue_h2,
+    SUM(a.Revenue) AS revenue_total,
+    SUM(CASE WHEN a.Month BETWEEN 1 AND 6 THEN a.Quantity END) AS qty_h1,
+    SUM(CASE WHEN a.Month BETWEEN 7 AND 12 THEN a.Quantity END) AS qty_h2,
+    SUM(a.Quantity) AS qty_total
+FROM AggProductMonth a
+JOIN DimProduct p ON a.Product_ID = p.Product_ID
+GROUP BY p.Product_Name;
+
+-- Q20. Create a View STORE_QUARTERLY_SALES for Optimized Sales Analysis
+-- (reads AggStoreQuarter, kept up to date by the ETL, instead of FactSales)
+CREATE OR REPLACE VIEW STORE_QUARTERLY_SALES AS
+SELECT
+    s.Store_Name,
+    a.Year,
+    a.Quarter,
+    SUM(a.Revenue) AS quarterly_sales
+FROM AggStoreQuarter a
+JOIN DimStore s ON a.Store_ID = s.Store_ID
+GROUP BY s.Store_Name, a.Year, a.Quarter
+ORDER BY s.Store_Name, a.Year, a.Quarter;
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'hybrid_join'))
+
+from stream_buffer import StreamBuffer
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def test_snapshot_while_push_is_blocked_counts_only_buffered_tuples():
+    stream_buffer = StreamBuffer(capacity=4, high_watermark=4, low_watermark=2, policy="block", stamp=False)
+    rows = [(i,) for i in range(10)]
+    producer = threading.Thread(target=stream_buffer.push_many, args=(rows,), daemon=True)
+    producer.start()
+
+    # The producer fills the buffer to the high watermark and waits with the lock released
+    wait_until(lambda: stream_buffer.size() == 4)
+    assert producer.is_alive()
+    offset, items = stream_buffer.snapshot()
+    assert offset == 4
+    assert items == rows[:4]
+
+    # Every snapshot: stream offset = tuples consumed + tuples buffered
+    consumed = []
+    while len(consumed) < len(rows):
+        consumed.extend(stream_buffer.pop_many(3, timeout=1))
+        offset, items = stream_buffer.snapshot()
+        assert offset == len(consumed) + len(items)
+        assert consumed + items == rows[:offset]
+
+    producer.join(1)
+    assert not producer.is_alive()
+    assert consumed == rows
+    assert stream_buffer.pushed == len(rows)